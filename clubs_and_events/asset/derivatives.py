@@ -0,0 +1,109 @@
+import datetime
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from asset.imaging import DERIVATIVE_FORMATS, render_derivatives
+from asset.models import AlbumImage
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    # Worker processes are spawned rather than forked so that they don't inherit database connections or threads of
+    # the web server, they only import asset.imaging.
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'ALBUM_IMAGE_WORKERS', 2), mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def get_derivative_path(album_image, width, extension):
+    stem = os.path.splitext(os.path.basename(album_image.image.name))[0]
+    return 'storage/album/{}/derivatives/{}_{}.{}'.format(album_image.album_id, stem, width, extension)
+
+
+def save_derivatives(album_image, metadata, derivatives):
+    extensions = {i[0]: i[2] for i in DERIVATIVE_FORMATS}
+
+    paths = dict()
+    for name, widths in derivatives.items():
+        paths[name] = dict()
+        for width, data in widths.items():
+            path = get_derivative_path(album_image, width, extensions[name])
+            paths[name][str(width)] = default_storage.save(path, ContentFile(data))
+
+    captured_at = None
+    if metadata['captured_at'] is not None:
+        try:
+            captured_at = datetime.datetime.strptime(metadata['captured_at'], '%Y:%m:%d %H:%M:%S')
+            captured_at = timezone.make_aware(captured_at)
+        except ValueError:
+            pass
+
+    AlbumImage.objects.filter(pk=album_image.id).update(
+        width=metadata['width'], height=metadata['height'], captured_at=captured_at, derivatives=paths,
+        is_processed=True, updated_at=timezone.now()
+    )
+
+    # Derivatives of a previous run are replaced
+    delete_derivatives(album_image.derivatives)
+
+
+def delete_derivatives(derivatives):
+    for widths in derivatives.values():
+        for path in widths.values():
+            default_storage.delete(path)
+
+
+def get_source(album_image):
+    # Workers read local files themselves, other storages hand over the content
+    try:
+        return default_storage.path(album_image.image.name)
+    except NotImplementedError:
+        with default_storage.open(album_image.image.name, 'rb') as file:
+            return file.read()
+
+
+def process_album_image(album_image):
+    # Processes an album image in the calling process, used by the process_album_images command
+    save_derivatives(album_image, *render_derivatives(get_source(album_image)))
+
+
+def schedule_album_images(album_image_ids):
+    # Hands the images to the worker pool once the transaction creating them is committed, the request only waits for
+    # the submission. Images left unprocessed (e.g. by a restart) are picked up by the process_album_images command.
+    def submit():
+        executor = get_executor()
+        for album_image in AlbumImage.objects.filter(pk__in=album_image_ids):
+            future = executor.submit(render_derivatives, get_source(album_image))
+            future.add_done_callback(lambda i, album_image=album_image: on_rendered(album_image, i))
+
+    transaction.on_commit(submit)
+
+
+def on_rendered(album_image, future):
+    # Runs in a thread of the executor, which has its own database connections to close
+    try:
+        exception = future.exception()
+        if exception is not None:
+            # The image stays unprocessed, the process_album_images command retries it
+            logger.error('Rendering the derivatives of album image %s failed', album_image.id, exc_info=exception)
+            return
+        save_derivatives(album_image, *future.result())
+    except Exception:
+        logger.exception('Saving the derivatives of album image %s failed', album_image.id)
+    finally:
+        connections.close_all()
@@ -0,0 +1,48 @@
+import io
+
+from PIL import Image, ImageOps
+
+
+# Only depends on Pillow so that it can be imported by worker processes without setting up Django
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_FORMATS = (('jpeg', 'JPEG', 'jpg'), ('webp', 'WEBP', 'webp'))
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def get_capture_time(image):
+    # Returns the EXIF capture time as written by the camera, in the 'YYYY:MM:DD HH:MM:SS' format
+    exif = image.getexif()
+    value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if isinstance(value, bytes):
+        value = value.decode('ascii', errors='ignore')
+    return value.strip('\x00 ') if value else None
+
+
+def render_derivatives(source):
+    # Decodes the original (a file path or its content) once and returns its metadata with the encoded derivatives as
+    # {format: {width: bytes}}, every width of DERIVATIVE_WIDTHS smaller than the original in every format.
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as original:
+        captured_at = get_capture_time(original)
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+    widths = [i for i in DERIVATIVE_WIDTHS if i < image.width] or [image.width]
+    derivatives = {i[0]: dict() for i in DERIVATIVE_FORMATS}
+
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+
+        for name, pillow_format, _ in DERIVATIVE_FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pillow_format, quality=80)
+            derivatives[name][width] = buffer.getvalue()
+
+    metadata = {'width': image.width, 'height': image.height, 'captured_at': captured_at}
+
+    return metadata, derivatives
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from asset.derivatives import process_album_image
+from asset.models import AlbumImage
+
+
+class Command(BaseCommand):
+    help = 'Generates the derivatives and metadata of album images which have not been processed yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Reprocesses every album image.')
+
+    def handle(self, *args, **options):
+        queryset = AlbumImage.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(is_processed=False)
+
+        count = 0
+        for album_image in queryset.iterator():
+            try:
+                process_album_image(album_image)
+                count += 1
+            except (OSError, ValueError) as error:
+                self.stderr.write('Album image {}: {}'.format(album_image.id, error))
+
+        self.stdout.write('Processed {} album images.'.format(count))
@@ -40,23 +40,17 @@ class Album(models.Model):
     def clean(self):
         errors = list()
 
-        try:
-            if CommunityEvent.objects.get(pk=self.community.id):
-                errors.append(ValidationError(
-                    _('Albums are not able to be created under community events.'),
-                    code='hierarchy_error'
-                ))
-        except CommunityEvent.DoesNotExist:
-            pass
-
-        try:
-            if Event.objects.get(pk=self.community.id) is not None and self.community_event is not None:
-                errors.append(ValidationError(
-                    _('Albums are not able to be linked to community events if created under an event.'),
-                    code='hierarchy_error'
-                ))
-        except Event.DoesNotExist:
-            pass
+        if self.community.is_community_event:
+            errors.append(ValidationError(
+                _('Albums are not able to be created under community events.'),
+                code='hierarchy_error'
+            ))
+
+        if self.community.is_event and self.community_event is not None:
+            errors.append(ValidationError(
+                _('Albums are not able to be linked to community events if created under an event.'),
+                code='hierarchy_error'
+            ))
 
         if self.community_event is not None and (self.community.id != self.community_event.created_under.id):
             errors.append(ValidationError(
@@ -77,7 +71,14 @@ class AlbumImage(models.Model):
 
     album = models.ForeignKey(Album, on_delete=models.CASCADE)
     image = models.ImageField(upload_to=get_image_path)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    captured_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    is_processed = models.BooleanField(default=False, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set when the derivatives are saved, which changes the representation of the image
+    updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
                                    related_name='album_image_created_by')
 
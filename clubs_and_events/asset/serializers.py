@@ -1,9 +1,9 @@
+from django.core.files.storage import default_storage
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
 from asset.models import Announcement, Album, Comment, AlbumImage
-from community.models import Event, CommunityEvent
-from membership.models import Membership
+from core.roles import STAFF, has_active_position
 
 
 class ExistingAnnouncementSerializer(serializers.ModelSerializer):
@@ -20,14 +20,7 @@ class NotExistingAnnouncementSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_by', 'updated_by')
 
     def validate(self, data):
-        membership = Membership.objects.filter(
-            user_id=self.context['request'].user.id,
-            position__in=[1, 2, 3],
-            community_id=data['community'].id,
-            status='A'
-        )
-
-        if len(membership) == 0:
+        if not has_active_position(self.context['request'], data['community'].id, STAFF):
             raise serializers.ValidationError(
                 _('Announcements are not able to be created in communities the user is not a staff.'),
                 code='permission_denied'
@@ -44,14 +37,11 @@ class ExistingAlbumSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         if data['community_event'] is not None:
-            try:
-                if Event.objects.get(pk=data['community'].id) is not None:
-                    raise serializers.ValidationError(
-                        _('Albums are not able to be linked to community events if created under an event.'),
-                        code='hierarchy_error'
-                    )
-            except Event.DoesNotExist:
-                pass
+            if data['community'].is_event:
+                raise serializers.ValidationError(
+                    _('Albums are not able to be linked to community events if created under an event.'),
+                    code='hierarchy_error'
+                )
 
             if data['community_event'].created_under.id != data['community'].id:
                 raise serializers.ValidationError(
@@ -70,24 +60,18 @@ class NotExistingAlbumSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_by', 'updated_by')
 
     def validate(self, data):
-        try:
-            if CommunityEvent.objects.get(pk=data['community'].id):
+        if data['community'].is_community_event:
+            raise serializers.ValidationError(
+                _('Albums are not able to be created under community events.'),
+                code='hierarchy_error'
+            )
+
+        if data['community_event'] is not None:
+            if data['community'].is_event:
                 raise serializers.ValidationError(
-                    _('Albums are not able to be created under community events.'),
+                    _('Albums are not able to be linked to community events if created under an event.'),
                     code='hierarchy_error'
                 )
-        except CommunityEvent.DoesNotExist:
-            pass
-
-        if data['community_event'] is not None:
-            try:
-                if Event.objects.get(pk=data['community'].id) is not None:
-                    raise serializers.ValidationError(
-                        _('Albums are not able to be linked to community events if created under an event.'),
-                        code='hierarchy_error'
-                    )
-            except Event.DoesNotExist:
-                pass
 
             if data['community_event'].created_under.id != data['community'].id:
                 raise serializers.ValidationError(
@@ -99,11 +83,29 @@ class NotExistingAlbumSerializer(serializers.ModelSerializer):
 
 
 class AlbumImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = AlbumImage
-        fields = '__all__'
+        exclude = ('derivatives',)
         read_only_fields = ('created_by',)
 
+    def get_srcset(self, obj):
+        # {format: 'url 320w, url 640w, ...'}, empty until the derivatives are generated
+        request = self.context.get('request')
+
+        srcset = dict()
+        for name, widths in obj.derivatives.items():
+            candidates = list()
+            for width, path in sorted(widths.items(), key=lambda i: int(i[0])):
+                url = default_storage.url(path)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                candidates.append('{} {}w'.format(url, width))
+            srcset[name] = ', '.join(candidates)
+
+        return srcset
+
 
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from asset.derivatives import delete_derivatives
+from asset.models import Announcement, Album, AlbumImage
+from core.cache import bump_version
+
+
+@receiver(post_delete, sender=AlbumImage)
+def delete_album_image_derivatives(sender, instance, **kwargs):
+    delete_derivatives(instance.derivatives)
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def bump_announcement_response_cache_version(sender, **kwargs):
+    bump_version('announcement')
+
+
+@receiver(post_save, sender=Album)
+@receiver(post_delete, sender=Album)
+@receiver(post_save, sender=AlbumImage)
+@receiver(post_delete, sender=AlbumImage)
+def bump_album_response_cache_version(sender, **kwargs):
+    bump_version('album')
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from asset.derivatives import on_rendered, process_album_image
+from asset.imaging import EXIF_DATETIME_ORIGINAL, EXIF_IFD
+from asset.models import Album, AlbumImage
+from asset.serializers import AlbumImageSerializer
+from community.models import Club
+from core.cache import get_versions
+from core.models import StoredFile
+from membership.models import Membership
+from user.models import User
+
+BOB = {'username': 'bob', 'password': 'password303'}
+JOE = {'username': 'joe', 'password': 'password303'}
+
+
+def make_jpeg(width, height, captured_at=None):
+    image = Image.new('RGB', (width, height), color=(200, 80, 40))
+    exif = Image.Exif()
+    if captured_at is not None:
+        exif.get_ifd(EXIF_IFD)[EXIF_DATETIME_ORIGINAL] = captured_at
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class AlbumImageDerivativeTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        club = Club.objects.create(name_th='ชมรมถ่ายภาพ', name_en='Photography Club')
+        self.album = Album.objects.create(name='Freshmen Fair', community=club)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_album_image(self, data):
+        return AlbumImage.objects.create(album=self.album, image=SimpleUploadedFile('photo.jpg', data))
+
+    def test_process_album_image(self):
+        album_image = self.create_album_image(make_jpeg(1000, 500, captured_at='2023:08:01 10:30:00'))
+        process_album_image(album_image)
+        album_image.refresh_from_db()
+
+        self.assertTrue(album_image.is_processed)
+        self.assertEqual((album_image.width, album_image.height), (1000, 500))
+        self.assertEqual(album_image.captured_at, timezone.make_aware(datetime.datetime(2023, 8, 1, 10, 30)))
+        self.assertEqual(set(album_image.derivatives), {'jpeg', 'webp'})
+        self.assertEqual(set(album_image.derivatives['webp']), {'320', '640'})
+
+        with Image.open(os.path.join(self.media_root, album_image.derivatives['webp']['320'])) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (320, 160)))
+
+        srcset = AlbumImageSerializer(album_image).data['srcset']
+        self.assertRegex(srcset['webp'], r'^\S+\.webp 320w, \S+\.webp 640w$')
+
+    def test_process_small_album_image(self):
+        album_image = self.create_album_image(make_jpeg(200, 100))
+        process_album_image(album_image)
+        album_image.refresh_from_db()
+
+        self.assertIsNone(album_image.captured_at)
+        self.assertEqual(set(album_image.derivatives['jpeg']), {'200'})
+
+    def test_conditional_get_after_processing(self):
+        album_image = self.create_album_image(make_jpeg(400, 200))
+        paths = ('/api/asset/album/image/{}/'.format(album_image.id), '/api/asset/album/image/')
+        self.album.community.is_publicly_visible = True
+        self.album.community.save()
+
+        etags = [self.client.get(i)['ETag'] for i in paths]
+        process_album_image(album_image)
+
+        # Clients holding the representations from before the processing get the derivatives
+        for path, etag in zip(paths, etags):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_rendering_failure(self):
+        album_image = self.create_album_image(b'not an image')
+        future = Future()
+        future.set_exception(OSError('cannot identify image file'))
+
+        # The connections of the test case are kept open
+        with mock.patch('asset.derivatives.connections'), self.assertLogs('asset.derivatives', 'ERROR') as logs:
+            on_rendered(album_image, future)
+
+        self.assertIn('album image {}'.format(album_image.id), logs.output[0])
+        album_image.refresh_from_db()
+        self.assertFalse(album_image.is_processed)
+
+
+@override_settings(ALBUM_IMAGE_WORKERS=1)
+class AlbumImageBatchUploadTest(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        User.objects.create_user(username=JOE['username'], password=JOE['password'])
+
+        club = Club.objects.create(name_th='ชมรมถ่ายภาพ', name_en='Photography Club')
+        Membership.objects.create(user=bob, community=club, position=1)
+        self.album = Album.objects.create(name='Freshmen Fair', community=club)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, user, files):
+        self.client.login(username=user['username'], password=user['password'])
+        response = self.client.post(
+            '/api/asset/album/image/batch/', {'album': self.album.id, 'image': files}, format='multipart'
+        )
+        self.client.logout()
+
+        return response
+
+    def test_batch_upload(self):
+        files = [
+            SimpleUploadedFile('photo_{}.jpg'.format(i), make_jpeg(100, 50), content_type='image/jpeg')
+            for i in range(3)
+        ]
+        files.append(SimpleUploadedFile('notes.txt', b'not an image', content_type='text/plain'))
+        response = self.upload(BOB, files)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 3)
+        self.assertEqual([(i['index'], i['name']) for i in response.data['errors']], [(3, 'notes.txt')])
+        self.assertEqual(AlbumImage.objects.filter(album=self.album).count(), 3)
+
+        for album_image in AlbumImage.objects.filter(album=self.album):
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, album_image.image.name)))
+
+        self.album.refresh_from_db()
+        self.assertEqual(self.album.updated_by.username, BOB['username'])
+
+    def test_batch_upload_ids_and_cache_version(self):
+        files = [
+            SimpleUploadedFile('photo_{}.jpg'.format(i), make_jpeg(100, 50 + i), content_type='image/jpeg')
+            for i in range(2)
+        ]
+        version = get_versions(('album',))
+
+        # Only the cache callback is run, the images are not rendered
+        with mock.patch('asset.views.schedule_album_images'), self.captureOnCommitCallbacks(execute=True):
+            response = self.upload(BOB, files)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [i['id'] for i in response.data['created']],
+            list(AlbumImage.objects.filter(album=self.album).order_by('pk').values_list('pk', flat=True))
+        )
+        self.assertNotEqual(get_versions(('album',)), version)
+
+    def test_batch_upload_failure_releases_files(self):
+        files = [SimpleUploadedFile('photo.jpg', make_jpeg(100, 50), content_type='image/jpeg')]
+
+        # Integrity errors other than the conflicts of core.exceptions are server errors
+        with mock.patch.object(AlbumImage.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.upload(BOB, files)
+
+        self.assertEqual(StoredFile.objects.count(), 0)
+
+    def test_batch_upload_without_valid_images(self):
+        response = self.upload(BOB, [SimpleUploadedFile('notes.txt', b'not an image', content_type='text/plain')])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AlbumImage.objects.count(), 0)
+
+    def test_batch_upload_not_staff(self):
+        response = self.upload(JOE, [SimpleUploadedFile('photo.jpg', make_jpeg(100, 50), content_type='image/jpeg')])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(AlbumImage.objects.count(), 0)
@@ -1,27 +1,40 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Max
 from django.http import Http404
-from rest_framework import viewsets, permissions, status, filters
+from django.utils import timezone
+from rest_framework import viewsets, permissions, serializers, status, filters
+from rest_framework.decorators import action
+from rest_framework.fields import get_error_detail
 from rest_framework.response import Response
 
+from asset.derivatives import schedule_album_images
 from asset.models import Announcement, Album, AlbumImage, Comment
 from asset.serializers import ExistingAnnouncementSerializer, NotExistingAnnouncementSerializer
 from asset.serializers import ExistingAlbumSerializer, NotExistingAlbumSerializer
 from asset.serializers import AlbumImageSerializer, CommentSerializer
-from community.models import Community, Event
-from core.permissions import IsStaffOfCommunity, IsInPubliclyVisibleCommunity
-from core.utils import filter_queryset
+from core.cache import AnonymousResponseCacheMixin, bump_version
+from core.conditional import ConditionalGetMixin
+from core.filters import FilterSpec, QueryFilter, QueryFilterBackend, VisibilityFilterBackend
+from core.permissions import IsStaffOfCommunity
+from core.roles import STAFF, has_active_position
 from user.models import User
 
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Announcement.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (VisibilityFilterBackend, filters.SearchFilter, QueryFilterBackend)
+    visibility_field = 'community'
     search_fields = ('text',)
+    filter_spec = FilterSpec(
+        community=QueryFilter(int, is_foreign_key=True),
+    )
+    cache_namespaces = ('community', 'announcement')
 
     def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        elif self.request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        if self.request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
             # Includes IsStaffOfCommunity() in validation() of the serializer for POST request separately
             return (permissions.IsAuthenticated(), IsStaffOfCommunity())
         return tuple()
@@ -31,19 +44,6 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
             return NotExistingAnnouncementSerializer
         return ExistingAnnouncementSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = Community.objects.filter(is_publicly_visible=True)
-            queryset = queryset.filter(community_id__in=visible_ids)
-
-        queryset = filter_queryset(queryset, request, target_param='community', is_foreign_key=True)
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
@@ -59,16 +59,19 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class AlbumViewSet(viewsets.ModelViewSet):
+class AlbumViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Album.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (VisibilityFilterBackend, filters.SearchFilter, QueryFilterBackend)
+    visibility_field = 'community'
     search_fields = ('name',)
+    filter_spec = FilterSpec(
+        community=QueryFilter(int, is_foreign_key=True),
+    )
+    cache_namespaces = ('community', 'album')
 
     def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        elif self.request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        if self.request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
             # Includes IsStaffOfCommunity() in validation() of the serializer for POST request separately
             return (permissions.IsAuthenticated(), IsStaffOfCommunity())
         return tuple()
@@ -78,50 +81,29 @@ class AlbumViewSet(viewsets.ModelViewSet):
             return NotExistingAlbumSerializer
         return ExistingAlbumSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = Community.objects.filter(is_publicly_visible=True)
-            queryset = queryset.filter(community_id__in=visible_ids)
-
-        queryset = filter_queryset(queryset, request, target_param='community', is_foreign_key=True)
 
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
-
-class AlbumImageViewSet(viewsets.ModelViewSet):
+class AlbumImageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = AlbumImage.objects.all()
     serializer_class = AlbumImageSerializer
     http_method_names = ('get', 'post', 'delete', 'head', 'options')
+    filter_backends = (VisibilityFilterBackend, QueryFilterBackend)
+    visibility_field = 'album__community'
+    filter_spec = FilterSpec(
+        album=QueryFilter(int, is_foreign_key=True),
+    )
+    max_batch_size = 500
 
     def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        elif self.request.method in ('POST', 'DELETE'):
+        if self.request.method in ('POST', 'DELETE'):
             # Includes IsStaffOfCommunity() in validation() of the serializer for POST request separately
             return (permissions.IsAuthenticated(), IsStaffOfCommunity())
         return tuple()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = Community.objects.filter(is_publicly_visible=True)
-            queryset = queryset.filter(community_id__in=visible_ids)
-
-        queryset = filter_queryset(queryset, request, target_param='album', is_foreign_key=True)
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
-        serializer.save(created_by=request.user)
+        obj = serializer.save(created_by=request.user)
+        schedule_album_images([obj.id])
 
         album = Album.objects.get(pk=request.data['album'])
         album.updated_by = request.user
@@ -129,6 +111,76 @@ class AlbumImageViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Batch uploads stream every file to a temporary file instead of keeping the smaller ones in memory, saving
+        # them to the file system storage is then a move.
+        if self.action_map.get(request.method.lower()) == 'batch':
+            request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        try:
+            album = Album.objects.get(pk=int(request.data.get('album')))
+        except (TypeError, ValueError, Album.DoesNotExist):
+            return Response({'album': ['Invalid album.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not has_active_position(request, album.community_id, STAFF):
+            return Response(
+                {'detail': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        files = request.FILES.getlist('image')
+        if not 0 < len(files) <= self.max_batch_size:
+            return Response(
+                {'image': ['Between 1 and {} images must be uploaded at once.'.format(self.max_batch_size)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        image_field = serializers.ImageField()
+        album_images = list()
+        errors = list()
+
+        try:
+            for index, file in enumerate(files):
+                try:
+                    image_field.run_validation(file)
+                except serializers.ValidationError as error:
+                    errors.append({'index': index, 'name': file.name, 'image': error.detail})
+                    continue
+                except DjangoValidationError as error:
+                    errors.append({'index': index, 'name': file.name, 'image': get_error_detail(error)})
+                    continue
+
+                album_image = AlbumImage(album=album, created_by=request.user)
+                album_image.image.save(file.name, file, save=False)
+                album_images.append(album_image)
+
+            if len(album_images) == 0:
+                return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            with transaction.atomic():
+                # Updating the album locks it until the commit, the images of the album above its last id are then
+                # the ones inserted here. bulk_create() does not set ids on every backend.
+                Album.objects.filter(pk=album.id).update(updated_by=request.user, updated_at=timezone.now())
+                last_id = AlbumImage.objects.filter(album=album).aggregate(last_id=Max('pk'))['last_id'] or 0
+                AlbumImage.objects.bulk_create(album_images)
+                album_images = list(AlbumImage.objects.filter(album=album, pk__gt=last_id).order_by('pk'))
+
+                # Neither the update nor bulk_create() send post_save, which bumps the cached album responses
+                transaction.on_commit(lambda: bump_version('album'))
+        except Exception:
+            # Releases the references of the files stored so far
+            for album_image in album_images:
+                album_image.image.delete(save=False)
+            raise
+
+        schedule_album_images([i.id for i in album_images])
+
+        serializer = self.get_serializer(album_images, many=True)
+
+        return Response({'created': serializer.data, 'errors': errors}, status=status.HTTP_201_CREATED)
+
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -143,30 +195,17 @@ class AlbumImageViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     http_method_names = ('get', 'post', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (VisibilityFilterBackend, filters.SearchFilter, QueryFilterBackend)
+    visibility_field = 'event'
     search_fields = ('text', 'written_by')
-
-    def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        return tuple()
-
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = Event.objects.filter(is_publicly_visible=True)
-            queryset = queryset.filter(event_id__in=visible_ids)
-
-        queryset = filter_queryset(queryset, request, target_param='event', is_foreign_key=True)
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
+    filter_spec = FilterSpec(
+        event=QueryFilter(int, is_foreign_key=True),
+    )
+    last_modified_field = 'created_at'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
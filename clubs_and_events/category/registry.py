@@ -0,0 +1,50 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from category.models import ClubType, EventType, EventSeries
+from category.serializers import ClubTypeSerializer, EventTypeSerializer, EventSeriesSerializer
+from core.cache import get_versions
+
+
+# Categories are loaded into every process at once and kept until the category version is bumped by saving or
+# deleting any category, so looking them up costs a cache read instead of database queries. The version only reaches
+# the other processes through a shared cache, so the categories are also reloaded after CATEGORY_REGISTRY_TIMEOUT
+# seconds. The registry is (digest, categories), the digest of the loaded categories tags responses served from them.
+
+SERIALIZERS = {
+    ClubType: ClubTypeSerializer,
+    EventType: EventTypeSerializer,
+    EventSeries: EventSeriesSerializer,
+}
+
+# (version, time of loading, registry)
+_registry = (None, 0, (None, dict()))
+
+
+def get_version():
+    return get_versions(('category',))[0]
+
+
+def get_registry():
+    global _registry
+
+    version = get_version()
+    if _registry[0] != version or time.monotonic() - _registry[1] >= settings.CATEGORY_REGISTRY_TIMEOUT:
+        # The version is read before loading, so the loaded categories are at least as recent as the version
+        categories = dict()
+        for model, serializer_class in SERIALIZERS.items():
+            data = serializer_class(model.objects.order_by('id'), many=True).data
+            categories[model] = {i['id']: dict(i) for i in data}
+
+        content = json.dumps([sorted(categories[i].items()) for i in SERIALIZERS], cls=DjangoJSONEncoder)
+        _registry = (version, time.monotonic(), (hashlib.sha1(content.encode()).hexdigest(), categories))
+
+    return _registry[2]
+
+
+def get_categories(model):
+    return get_registry()[1][model]
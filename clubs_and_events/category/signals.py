@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from category.models import ClubType, EventType, EventSeries
+from core.cache import bump_version
+
+
+@receiver(post_save, sender=ClubType)
+@receiver(post_delete, sender=ClubType)
+@receiver(post_save, sender=EventType)
+@receiver(post_delete, sender=EventType)
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+def bump_category_version(sender, **kwargs):
+    bump_version('category')
@@ -1,3 +1,89 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from category.models import ClubType, EventType
+from category.registry import get_categories
+from community.models import Club
+from user.models import User
+
+BOB = {'username': 'bob', 'password': 'password303'}
+
+
+class CategoryRegistryTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username=BOB['username'], password=BOB['password'])
+
+        self.academic = ClubType.objects.create(title_th='วิชาการ', title_en='Academic')
+        self.sports = ClubType.objects.create(title_th='กีฬา', title_en='Sports')
+        Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', club_type=self.academic, is_official=True)
+
+    def test_registry_is_loaded_once(self):
+        get_categories(ClubType)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(set(get_categories(ClubType)), {self.academic.id, self.sports.id})
+            self.assertEqual(get_categories(EventType), {})
+
+    def test_registry_follows_updates(self):
+        get_categories(ClubType)
+
+        self.sports.title_en = 'Sports and Recreation'
+        self.sports.save()
+        EventType.objects.create(title_th='สัมมนา', title_en='Seminar')
+
+        self.assertEqual(get_categories(ClubType)[self.sports.id]['title_en'], 'Sports and Recreation')
+        self.assertEqual(len(get_categories(EventType)), 1)
+
+    def test_registry_expires(self):
+        get_categories(ClubType)
+        response = self.client.get('/api/category/type/club/')
+
+        # A rename made through another process, whose version bump does not reach this one
+        ClubType.objects.filter(pk=self.sports.id).update(title_en='Sports and Recreation')
+        self.assertEqual(get_categories(ClubType)[self.sports.id]['title_en'], 'Sports')
+
+        with override_settings(CATEGORY_REGISTRY_TIMEOUT=0):
+            self.assertEqual(get_categories(ClubType)[self.sports.id]['title_en'], 'Sports and Recreation')
+            response = self.client.get('/api/category/type/club/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_categories(self):
+        response = self.client.get('/api/category/type/club/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['title_en'] for i in response.data], ['Academic', 'Sports'])
+        self.assertIn('max-age', response['Cache-Control'])
+
+        response = self.client.get('/api/category/type/club/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_category(self):
+        response = self.client.get('/api/category/type/club/{}/'.format(self.sports.id))
+        self.assertEqual(response.data['title_th'], 'กีฬา')
+
+        response = self.client.get('/api/category/type/club/0/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_expand_category(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        response = self.client.get('/api/community/club/')
+        self.assertEqual(response.data['results'][0]['club_type'], self.academic.id)
+
+        get_categories(ClubType)
+        with self.assertNumQueries(len(self.get_queries('/api/community/club/'))):
+            response = self.client.get('/api/community/club/?expand=category')
+
+        self.assertEqual(response.data['results'][0]['club_type'], {
+            'id': self.academic.id, 'title_th': 'วิชาการ', 'title_en': 'Academic'
+        })
+
+    def get_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(path)
+        return context.captured_queries
@@ -1,25 +1,62 @@
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import viewsets
+from rest_framework.response import Response
 
 from category.models import ClubType, EventType, EventSeries
+from category.registry import get_registry
 from category.serializers import ClubTypeSerializer, EventTypeSerializer, EventSeriesSerializer
+from core.conditional import get_etag
 
 
-class ClubTypeViewSet(viewsets.ModelViewSet):
+class CategoryRegistryMixin:
+    # Served from the category registry without pagination, categories are few and rarely change. Responses may be
+    # cached by clients and proxies for CATEGORY_CACHE_MAX_AGE seconds and revalidated with the digest of the registry.
+    pagination_class = None
+
+    def get_registry_response(self, get_data):
+        digest, categories = get_registry()
+        data = get_data(categories[self.queryset.model])
+        etag = get_etag(self.queryset.model._meta.label, digest)
+
+        response = get_conditional_response(self.request._request, etag=etag)
+        if response is None:
+            response = Response(data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.CATEGORY_CACHE_MAX_AGE)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_registry_response(lambda categories: list(categories.values()))
+
+    def retrieve(self, request, *args, **kwargs):
+        def get_data(categories):
+            try:
+                return categories[int(kwargs['pk'])]
+            except (KeyError, ValueError):
+                raise Http404
+
+        return self.get_registry_response(get_data)
+
+
+class ClubTypeViewSet(CategoryRegistryMixin, viewsets.ModelViewSet):
     ''' Club type view set '''
     queryset = ClubType.objects.all()
     serializer_class = ClubTypeSerializer
     http_method_names = ('get', 'head', 'options')
 
 
-class EventTypeViewSet(viewsets.ModelViewSet):
+class EventTypeViewSet(CategoryRegistryMixin, viewsets.ModelViewSet):
     ''' Event type view set '''
     queryset = EventType.objects.all()
     serializer_class = EventTypeSerializer
     http_method_names = ('get', 'head', 'options')
 
 
-class EventSeriesViewSet(viewsets.ModelViewSet):
+class EventSeriesViewSet(CategoryRegistryMixin, viewsets.ModelViewSet):
     ''' Event series view set '''
     queryset = EventSeries.objects.all()
     serializer_class = EventSeriesSerializer
-    http_method_names = ('get', 'head', 'options')
\ No newline at end of file
+    http_method_names = ('get', 'head', 'options')
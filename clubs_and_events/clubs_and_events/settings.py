@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import datetime
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'community',
     'asset',
     'membership',
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
 CORS_ORIGIN_ALLOW_ALL=True
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -143,6 +146,71 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Any backend works, e.g. 'django.core.cache.backends.filebased.FileBasedCache' to share entries between processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Responses to anonymous users are fresh for RESPONSE_CACHE_TIMEOUT seconds, stale responses are served for up to
+# RESPONSE_CACHE_STALE_TIMEOUT seconds while one worker rebuilds them.
+
+RESPONSE_CACHE_TIMEOUT = 60
+RESPONSE_CACHE_STALE_TIMEOUT = 600
+RESPONSE_CACHE_LOCK_TIMEOUT = 30
+
+# Calendar feeds are regenerated when the events they list change, CALENDAR_CACHE_TIMEOUT only bounds the lifetime of
+# feeds which are not polled anymore.
+
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Group names of users are cached until they change, USER_CLAIMS_TIMEOUT only bounds the lifetime of unused entries.
+
+USER_CLAIMS_TIMEOUT = 60 * 60
+
+# Tokens issued by the login API expire AUTH_TOKEN_EXPIRY after their creation, their users are cached for at most
+# AUTH_TOKEN_CACHE_TIMEOUT seconds.
+
+AUTH_TOKEN_EXPIRY = datetime.timedelta(days=7)
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 60
+
+# Signed access tokens are valid for ACCESS_TOKEN_LIFETIME seconds unless the groups or memberships of their user change
+
+ACCESS_TOKEN_LIFETIME = 5 * 60
+
+# Versions of users, which revoke their tokens, are stored with the users and mirrored in the cache for
+# USER_VERSION_CACHE_TIMEOUT seconds. With a cache which is not shared by the workers (LocMemCache), a token revoked
+# through one worker is still accepted by the others for at most that long.
+
+USER_VERSION_CACHE_TIMEOUT = 10
+
+# Categories are kept in every process until they change, or for at most CATEGORY_REGISTRY_TIMEOUT seconds when the
+# change was made through another process whose cache is not shared. Category responses may be cached by clients for
+# a day, they are revalidated with ETags afterwards.
+
+CATEGORY_REGISTRY_TIMEOUT = 60
+
+CATEGORY_CACHE_MAX_AGE = 60 * 60 * 24
+
+# Request metrics are served at /metrics to these addresses and to staff users, as histograms per route. In debug mode
+# the query count, database time and serializer time of each request are sent as X-DB-* and X-Serializer-* headers.
+
+INTERNAL_IPS = ['127.0.0.1']
+
+# Media files
+# Uploaded files are stored by the SHA-256 of their content, identical files are stored once.
+
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Album image derivatives
+# Number of worker processes generating thumbnails and WebP variants of uploaded album images.
+
+ALBUM_IMAGE_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -155,7 +223,14 @@ AUTH_USER_MODEL = 'user.User'
 
 REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
-    # 'DEFAULT_AUTHENTICATION_CLASSES': [
-    #     'rest_framework.authentication.TokenAuthentication'
-    # ]
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
+    # The first class gives the response to unauthenticated requests, sessions keep it 403 Forbidden
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'user.access_tokens.AccessTokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
 }
\ No newline at end of file
@@ -21,6 +21,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core.views import metrics
+
 schema_view = get_schema_view(
    openapi.Info(
       title="API Documentation",
@@ -41,6 +43,7 @@ urlpatterns = [
     path('api/community/', include('community.urls')),
     path('api/membership/', include('membership.urls')),
     path('api/user/', include('user.urls')),
+    path('metrics', metrics),
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
@@ -37,11 +37,7 @@ class EventAdmin(admin.ModelAdmin):
     inlines = [MembershipInline, InvitationInline, RequestInline, AdvisoryInline]
 
     def is_community_event(self, obj):
-        try:
-            if CommunityEvent.objects.get(pk=obj.id):
-                return True
-        except CommunityEvent.DoesNotExist:
-            return False
+        return obj.is_community_event
 
     is_community_event.boolean = True
 
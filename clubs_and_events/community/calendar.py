@@ -0,0 +1,152 @@
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from community.models import Event
+from core.cache import get_versions
+from membership.models import Membership
+from user.claims import get_user_namespace
+
+
+# iCalendar (RFC 5545) feeds of events. A feed is generated from a single query of the events it lists and cached with
+# the versions of the core.cache namespaces it depends on, 'community' for the events and the user namespace of
+# user.claims for the memberships of a user. Polling a feed which did not change is answered from the cache, or with
+# 304 Not Modified through its ETag, which is a digest of the content.
+
+CALENDAR_FIELDS = (
+    'id', 'name_en', 'description', 'location', 'start_date', 'end_date', 'start_time', 'end_time', 'is_cancelled',
+    'updated_at',
+)
+
+SALT = 'community.calendar'
+
+
+def escape(text):
+    text = text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+    return text.replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def fold(line):
+    # Content lines are folded at 75 octets, continuation lines start with a space
+    data = line.encode()
+    lines = list()
+
+    while len(data) > 75:
+        end = 75 if len(lines) == 0 else 74
+        # UTF-8 sequences are not split
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        lines.append(data[:end].decode())
+        data = data[end:]
+    lines.append(data.decode())
+
+    return '\r\n '.join(lines)
+
+
+def format_datetime(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def to_datetime(date, time):
+    # Dates and times of events are in the time zone of the campus, TIME_ZONE
+    return timezone.make_aware(datetime.datetime.combine(date, time), timezone.get_default_timezone())
+
+
+def build_calendar(name, rows):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Clubs and Events//Calendar//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:{}'.format(escape(name)),
+    ]
+
+    for event_id, title, description, location, start_date, end_date, start_time, end_time, is_cancelled, \
+            updated_at in rows:
+        lines += [
+            'BEGIN:VEVENT',
+            'UID:event-{}@clubs-and-events'.format(event_id),
+            'DTSTAMP:{}'.format(format_datetime(updated_at)),
+            'LAST-MODIFIED:{}'.format(format_datetime(updated_at)),
+            'DTSTART:{}'.format(format_datetime(to_datetime(start_date, start_time))),
+            'DTEND:{}'.format(format_datetime(to_datetime(end_date, end_time))),
+            'SUMMARY:{}'.format(escape(title)),
+            'LOCATION:{}'.format(escape(location)),
+            'STATUS:{}'.format('CANCELLED' if is_cancelled else 'CONFIRMED'),
+        ]
+        if description:
+            lines.append('DESCRIPTION:{}'.format(escape(description)))
+        lines.append('END:VEVENT')
+
+    lines.append('END:VCALENDAR')
+
+    return ''.join('{}\r\n'.format(fold(i)) for i in lines)
+
+
+def get_public_events():
+    return Event.objects.filter(is_publicly_visible=True, is_approved=True)
+
+
+def get_community_events(community_id):
+    # The community itself if it is an event and the community events created under it
+    return get_public_events().filter(Q(pk=community_id) | Q(communityevent__created_under_id=community_id))
+
+
+def get_user_events(user_id):
+    # Events the user is an active member of or created under communities the user is an active member of
+    memberships = Membership.objects.filter(user_id=user_id, status='A')
+    return Event.objects.filter(
+        Exists(memberships.filter(community_id=OuterRef('pk'))) |
+        Exists(memberships.filter(community_id=OuterRef('communityevent__created_under_id')))
+    )
+
+
+def get_calendar(key, namespaces, get_name, get_queryset):
+    # Returns (content, etag) of the feed, regenerated only if the versions of its namespaces changed
+    versions = get_versions(namespaces)
+    cache_key = 'calendar:{}'.format(key)
+
+    entry = cache.get(cache_key)
+    if entry is not None and entry['versions'] == versions:
+        return entry['content'], entry['etag']
+
+    rows = get_queryset().order_by('start_date', 'start_time', 'pk').values_list(*CALENDAR_FIELDS)
+    content = build_calendar(get_name(), rows)
+    etag = '"{}"'.format(hashlib.sha1(content.encode()).hexdigest())
+
+    cache.set(cache_key, {'versions': versions, 'content': content, 'etag': etag},
+              timeout=settings.CALENDAR_CACHE_TIMEOUT)
+
+    return content, etag
+
+
+def get_public_calendar():
+    return get_calendar('public', ('community',), lambda: 'Events', get_public_events)
+
+
+def get_community_calendar(community_id, get_name):
+    return get_calendar(
+        'community:{}'.format(community_id), ('community',), get_name, lambda: get_community_events(community_id)
+    )
+
+
+def get_user_calendar(user_id):
+    return get_calendar(
+        'user:{}'.format(user_id), ('community', get_user_namespace(user_id)), lambda: 'My Events',
+        lambda: get_user_events(user_id)
+    )
+
+
+def get_user_calendar_signature(user_id):
+    # Calendar applications do not authenticate, feeds of users are reached through a URL signed with the secret key
+    return salted_hmac(SALT, str(user_id), algorithm='sha256').hexdigest()[:32]
+
+
+def is_valid_user_calendar_signature(user_id, signature):
+    return constant_time_compare(signature, get_user_calendar_signature(user_id))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from community.models import Club, Event, Lab
+from community.search import update_search_document
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search documents of every community.'
+
+    def handle(self, *args, **options):
+        count = 0
+
+        # Community events are included as events, which carry every field of the search document
+        for model in (Club, Event, Lab):
+            for community in model.objects.iterator():
+                update_search_document(community)
+                count += 1
+
+        self.stdout.write('Indexed {} communities.'.format(count))
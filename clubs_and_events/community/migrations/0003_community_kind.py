@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def backfill_kind(apps, schema_editor):
+    Community = apps.get_model('community', 'Community')
+
+    # Community events are events as well, so they are set after the events
+    for kind, model in (('club', 'Club'), ('event', 'Event'), ('community_event', 'CommunityEvent'), ('lab', 'Lab')):
+        ids = apps.get_model('community', model).objects.values('pk')
+        Community.objects.filter(pk__in=ids).update(kind=kind)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0002_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='kind',
+            field=models.CharField(choices=[('club', 'Club'), ('event', 'Event'), ('community_event', 'Community Event'), ('lab', 'Lab')], db_index=True, default='', editable=False, max_length=16),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_kind, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,16 @@ from user.models import User
 
 
 class Community(models.Model):
+    KINDS = (
+        ('club', 'Club'),
+        ('event', 'Event'),
+        ('community_event', 'Community Event'),
+        ('lab', 'Lab'),
+    )
+
+    # Stored into kind on the first save of each concrete class
+    KIND = None
+
     def get_logo_path(self, file_name):
         file_extension = file_name.split('.')[1]
         return 'storage/community/{}/logo.{}'.format(self.id, file_extension)
@@ -24,6 +34,7 @@ class Community(models.Model):
     banner = models.ImageField(null=True, blank=True, upload_to=get_banner_path)
     is_publicly_visible = models.BooleanField(default=False)
     is_accepting_requests = models.BooleanField(default=True)
+    kind = models.CharField(max_length=16, choices=KINDS, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
@@ -34,8 +45,39 @@ class Community(models.Model):
     def __str__(self):
         return '{}'.format(self.name_en)
 
+    def save(self, *args, **kwargs):
+        if not self.kind and self.KIND is not None:
+            self.kind = self.KIND
+        super().save(*args, **kwargs)
+
+    @property
+    def is_club(self):
+        return self.kind == 'club'
+
+    @property
+    def is_event(self):
+        # Community events are events as well
+        return self.kind in ('event', 'community_event')
+
+    @property
+    def is_community_event(self):
+        return self.kind == 'community_event'
+
+    @property
+    def is_lab(self):
+        return self.kind == 'lab'
+
+    def get_concrete(self):
+        # Fetches the instance of the concrete class with a single query
+        model = {'club': Club, 'event': Event, 'community_event': CommunityEvent, 'lab': Lab}[self.kind]
+        if isinstance(self, model):
+            return self
+        return model.objects.get(pk=self.pk)
+
 
 class Club(Community):
+    KIND = 'club'
+
     STATUS = (
         ('R', 'Recruiting'),
         ('C', 'Closed'),
@@ -73,6 +115,8 @@ class Club(Community):
 
 
 class Event(Community):
+    KIND = 'event'
+
     event_type = models.ForeignKey(EventType, on_delete=models.SET_NULL, null=True, blank=True)
     event_series = models.ForeignKey(EventSeries, on_delete=models.SET_NULL, null=True, blank=True)
     location = models.CharField(max_length=255)
@@ -94,6 +138,8 @@ class Event(Community):
 
 
 class CommunityEvent(Event):
+    KIND = 'community_event'
+
     created_under = models.ForeignKey(Community, on_delete=models.PROTECT)
     allows_outside_participators = models.BooleanField(default=False)
 
@@ -104,23 +150,17 @@ class CommunityEvent(Event):
     def clean(self):
         errors = list()
 
-        try:
-            if Event.objects.get(pk=self.created_under.id) is not None:
-                errors.append(ValidationError(
-                    _('Community events are not able to be created under events.'),
-                    code='hierarchy_error'
-                ))
-        except Event.DoesNotExist:
-            pass
+        if self.created_under.is_event:
+            errors.append(ValidationError(
+                _('Community events are not able to be created under events.'),
+                code='hierarchy_error'
+            ))
 
-        try:
-            if not Club.objects.get(pk=self.created_under.id).is_official:
-                errors.append(ValidationError(
-                    _('Community events are not able to be created under unofficial clubs.'),
-                    code='unofficial_club_limitations'
-                ))
-        except Club.DoesNotExist:
-            pass
+        if self.created_under.is_club and not self.created_under.get_concrete().is_official:
+            errors.append(ValidationError(
+                _('Community events are not able to be created under unofficial clubs.'),
+                code='unofficial_club_limitations'
+            ))
 
         if not self.is_approved:
             errors.append(ValidationError(
@@ -133,6 +173,8 @@ class CommunityEvent(Event):
 
 
 class Lab(Community):
+    KIND = 'lab'
+
     STATUS = (
         ('R', 'Recruiting'),
         ('C', 'Closed'),
@@ -142,4 +184,14 @@ class Lab(Community):
     room = models.CharField(max_length=32, null=True, blank=True)
     founded_date = models.DateField(null=True, blank=True)
     tags = models.CharField(max_length=255, null=True, blank=True)
-    status = models.CharField(max_length=1, choices=STATUS, default='R')
\ No newline at end of file
+    status = models.CharField(max_length=1, choices=STATUS, default='R')
+
+
+class SearchDocument(models.Model):
+    community = models.OneToOneField(Community, on_delete=models.CASCADE, primary_key=True,
+                                     related_name='search_document')
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{}'.format(self.community_id)
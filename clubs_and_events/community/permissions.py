@@ -1,7 +1,6 @@
 from rest_framework import permissions
 
-from community.models import Community
-from membership.models import Membership
+from core.roles import LEADER, DEPUTY_LEADER, STAFF, MEMBER, has_active_position
 
 
 class IsPubliclyVisibleCommunity(permissions.BasePermission):
@@ -15,57 +14,37 @@ class IsPubliclyVisibleCommunity(permissions.BasePermission):
 class IsLeaderOfBaseCommunity(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: CommunityEvent
-        base_community = Community.objects.get(pk=obj.created_under.id)
-        base_membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[3], community_id=base_community.id, status='A'
-        )
-        membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[3], community_id=obj.id, status='A'
-        )
+        base_membership = has_active_position(request, obj.created_under_id, LEADER)
+        membership = has_active_position(request, obj.id, LEADER)
 
-        return len(base_membership) == 1 or len(membership) == 1
+        return base_membership or membership
 
 
 class IsDeputyLeaderOfBaseCommunity(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: CommunityEvent
-        base_community = Community.objects.get(pk=obj.created_under.id)
-        base_membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[2, 3], community_id=base_community.id, status='A'
-        )
-        membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[2, 3], community_id=obj.id, status='A'
-        )
+        base_membership = has_active_position(request, obj.created_under_id, DEPUTY_LEADER)
+        membership = has_active_position(request, obj.id, DEPUTY_LEADER)
 
-        return len(base_membership) == 1 or len(membership) == 1
+        return base_membership or membership
 
 
 class IsStaffOfBaseCommunity(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: CommunityEvent
-        base_community = Community.objects.get(pk=obj.created_under.id)
-        base_membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[1, 2, 3], community_id=base_community.id, status='A'
-        )
-        membership = Membership.objects.filter(
-            user_id=request.user.id, position__in=[1, 2, 3], community_id=obj.id, status='A'
-        )
+        base_membership = has_active_position(request, obj.created_under_id, STAFF)
+        membership = has_active_position(request, obj.id, STAFF)
 
-        return len(base_membership) == 1 or len(membership) == 1
+        return base_membership or membership
 
 
 class IsMemberOfBaseCommunity(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: CommunityEvent
-        base_community = Community.objects.get(pk=obj.created_under.id)
-        base_membership = Membership.objects.filter(
-            user_id=request.user.id, community_id=base_community.id, status='A'
-        )
-        membership = Membership.objects.filter(
-            user_id=request.user.id, community_id=obj.id, status='A'
-        )
-
-        return len(base_membership) == 1 or len(membership) == 1
+        base_membership = has_active_position(request, obj.created_under_id, MEMBER)
+        membership = has_active_position(request, obj.id, MEMBER)
+
+        return base_membership or membership
 
 
 # TODO: Implements a better deletable condition
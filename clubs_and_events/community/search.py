@@ -0,0 +1,150 @@
+from django.db import connections
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from community.models import SearchDocument
+
+
+DOCUMENT_FIELDS = ('name_th', 'name_en', 'url_id', 'description', 'location', 'tags')
+
+
+def build_document(community):
+    # Subclass fields (location of events, tags of labs) are included when the instance is of that subclass
+    values = (getattr(community, i, None) for i in DOCUMENT_FIELDS)
+    return '\n'.join(str(i) for i in values if i).casefold()
+
+
+def get_terms(query):
+    return query.casefold().split()
+
+
+class DatabaseSearchBackend:
+    # Portable fallback, a substring match on the stored search documents without ranking.
+    def __init__(self, using=None):
+        self.using = using or SearchDocument.objects.db
+
+    def create_tables(self):
+        pass
+
+    def index(self, community_id, document):
+        pass
+
+    def remove(self, community_id):
+        pass
+
+    def match(self, terms):
+        queryset = SearchDocument.objects.all()
+        for term in terms:
+            queryset = queryset.filter(document__contains=term)
+        return queryset
+
+    def filter(self, queryset, terms):
+        return queryset.filter(pk__in=self.match(terms).values('community_id'))
+
+    def rank(self, queryset, terms, limit):
+        matches = self.match(terms).filter(community_id__in=queryset.values('pk'))
+        return list(matches.order_by('community_id').values_list('community_id', flat=True)[:limit])
+
+
+class PostgreSQLSearchBackend(DatabaseSearchBackend):
+    # Substring matches are answered by the pg_trgm GIN index on the document column. Results are ranked by word
+    # similarity, which compares the query trigrams with the best matching extent of the document, so Thai text
+    # without word boundaries ranks as well as English.
+    def rank(self, queryset, terms, limit):
+        similarity = Func(Value(' '.join(terms)), F('document'), function='word_similarity', output_field=FloatField())
+        matches = self.match(terms).filter(community_id__in=queryset.values('pk')).annotate(rank=similarity)
+        return list(matches.order_by('-rank', 'community_id').values_list('community_id', flat=True)[:limit])
+
+
+class SQLiteSearchBackend(DatabaseSearchBackend):
+    # Mirrors the search documents into an FTS5 table with the trigram tokenizer, ranked by bm25. The table is created
+    # after migrating and again on the first use of each connection so that it exists regardless of how the database
+    # was set up. The trigram tokenizer cannot match terms shorter than three characters, those fall back to a
+    # substring match.
+    table = 'community_searchdocument_fts'
+
+    def ensure_tables(self):
+        # Checked once per database connection, an in-memory database loses its tables with its connection
+        wrapper = connections[self.using]
+        wrapper.ensure_connection()
+        if getattr(wrapper, 'search_tables_connection', None) is not wrapper.connection:
+            self.create_tables()
+            wrapper.search_tables_connection = wrapper.connection
+
+    def execute(self, sql, params=()):
+        self.ensure_tables()
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def create_tables(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5(document, tokenize=\'trigram\')'.format(self.table)
+            )
+
+    def index(self, community_id, document):
+        self.remove(community_id)
+        self.execute('INSERT INTO {} (rowid, document) VALUES (%s, %s)'.format(self.table), (community_id, document))
+
+    def remove(self, community_id):
+        self.execute('DELETE FROM {} WHERE rowid = %s'.format(self.table), (community_id,))
+
+    def get_match_query(self, terms):
+        if any(len(i) < 3 for i in terms):
+            return None
+        return ' AND '.join('"{}"'.format(i.replace('"', '""')) for i in terms)
+
+    def filter(self, queryset, terms):
+        query = self.get_match_query(terms)
+        if query is None:
+            return super().filter(queryset, terms)
+
+        self.ensure_tables()
+        return queryset.filter(pk__in=RawSQL('SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(self.table), (query,)))
+
+    def rank(self, queryset, terms, limit):
+        query = self.get_match_query(terms)
+        if query is None:
+            return super().rank(queryset, terms, limit)
+
+        sql, params = queryset.values('pk').query.sql_with_params()
+        rows = self.execute(
+            'SELECT rowid FROM {0} WHERE {0} MATCH %s AND rowid IN ({1}) ORDER BY rank LIMIT %s'.format(
+                self.table, sql
+            ),
+            (query, *params, -1 if limit is None else limit)
+        )
+        return [i[0] for i in rows]
+
+
+BACKENDS = {
+    'postgresql': PostgreSQLSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    using = using or SearchDocument.objects.db
+    return BACKENDS.get(connections[using].vendor, DatabaseSearchBackend)(using)
+
+
+def update_search_document(community):
+    document = build_document(community)
+    SearchDocument.objects.update_or_create(community_id=community.id, defaults={'document': document})
+    get_search_backend().index(community.id, document)
+
+
+def remove_search_document(community_id):
+    get_search_backend().remove(community_id)
+
+
+class CommunitySearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = get_terms(request.query_params.get(self.search_param, ''))
+        if len(terms) == 0:
+            return queryset
+        return get_search_backend().filter(queryset, terms)
@@ -1,84 +1,109 @@
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from category.models import ClubType, EventType, EventSeries
+from category.registry import get_registry
 from community.models import Club, Event, CommunityEvent, Lab, Community
-from membership.models import Membership
+from core.roles import STAFF, has_active_position
 
 
-class OfficialClubSerializer(serializers.ModelSerializer):
+CATEGORY_FIELDS = {
+    'club_type': ClubType,
+    'event_type': EventType,
+    'event_series': EventSeries,
+}
+
+
+class ExpandCategoryMixin:
+    # Inlines the titles of categories from the category registry instead of their ids with ?expand=category
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        request = self.context.get('request')
+        if request is None or 'category' not in request.query_params.get('expand', '').split(','):
+            return data
+
+        # Shared by every item of a list, the context belongs to the root serializer
+        if 'categories' not in self.context:
+            self.context['categories'] = get_registry()[1]
+
+        for field, model in CATEGORY_FIELDS.items():
+            category = self.context['categories'][model].get(data.get(field))
+            if category is not None:
+                data[field] = {i: category[i] for i in ('id', 'title_th', 'title_en')}
+
+        return data
+
+
+class OfficialClubSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = Club
         fields = '__all__'
         read_only_fields = ('is_official', 'created_by', 'updated_by')
 
 
-class UnofficialClubSerializer(serializers.ModelSerializer):
+class UnofficialClubSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = Club
         exclude = ('url_id', 'is_publicly_visible', 'room')
         read_only_fields = ('is_official', 'created_by', 'updated_by')
 
 
-class ApprovedEventSerializer(serializers.ModelSerializer):
+class ApprovedEventSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = '__all__'
         read_only_fields = ('is_approved', 'created_by', 'updated_by')
 
 
-class UnapprovedEventSerializer(serializers.ModelSerializer):
+class UnapprovedEventSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
         exclude = ('url_id', 'is_publicly_visible')
         read_only_fields = ('is_approved', 'created_by', 'updated_by')
 
 
-class ExistingCommunityEventSerializer(serializers.ModelSerializer):
+class ExistingCommunityEventSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = CommunityEvent
         fields = '__all__'
         read_only_fields = ('is_approved', 'created_under', 'created_by', 'updated_by')
 
 
-class NotExistingCommunityEventSerializer(serializers.ModelSerializer):
+class NotExistingCommunityEventSerializer(ExpandCategoryMixin, serializers.ModelSerializer):
     class Meta:
         model = CommunityEvent
         fields = '__all__'
         read_only_fields = ('is_approved', 'created_by', 'updated_by')
 
     def validate(self, data):
-        base_community = Community.objects.get(pk=data['created_under'].id)
-        base_membership = Membership.objects.filter(
-            user_id=self.context['request'].user.id, position__in=[1, 2, 3], community_id=base_community.id, status='A'
-        )
-
-        if len(base_membership) != 1:
+        if not has_active_position(self.context['request'], data['created_under'].id, STAFF):
             raise serializers.ValidationError(
                 _('Community events are not able to be created under communities you are not a staff.'),
                 code='permission_denied'
             )
 
-        try:
-            if not Club.objects.get(pk=data['created_under']).is_official:
-                raise serializers.ValidationError(
-                    _('Community events are not able to be created under unofficial clubs.'),
-                    code='unofficial_club_limitations'
-                )
-        except Club.DoesNotExist:
-            pass
-
-        try:
-            Event.objects.get(pk=data['created_under'])
+        if data['created_under'].is_club and not data['created_under'].get_concrete().is_official:
+            raise serializers.ValidationError(
+                _('Community events are not able to be created under unofficial clubs.'),
+                code='unofficial_club_limitations'
+            )
+
+        if data['created_under'].is_event:
             raise serializers.ValidationError(
                 _('Community events are not able to be created under events.'),
                 code='hierarchy_error'
             )
-        except Event.DoesNotExist:
-            pass
 
         return data
 
 
+class CommunitySearchResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Community
+        fields = ('id', 'kind', 'name_th', 'name_en', 'url_id', 'description', 'logo', 'is_publicly_visible')
+
+
 class LabSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lab
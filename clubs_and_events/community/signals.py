@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from community.models import Community
+from community.search import get_search_backend, remove_search_document, update_search_document
+from core.cache import bump_version
+
+
+@receiver(post_migrate)
+def create_search_tables(sender, using='default', **kwargs):
+    # Creates tables of the search backend outside of any transaction, SQLite fails on rolling back the creation of
+    # virtual tables, e.g. within test cases
+    if sender.name == 'community':
+        get_search_backend(using).create_tables()
+
+
+@receiver(post_save)
+def update_community_search_document(sender, instance, raw=False, **kwargs):
+    # Senders are the concrete classes (Club, Event, CommunityEvent, Lab), only one signal is sent per save
+    if issubclass(sender, Community) and not raw:
+        update_search_document(instance)
+
+
+@receiver(post_delete)
+def remove_community_search_document(sender, instance, **kwargs):
+    if issubclass(sender, Community):
+        remove_search_document(instance.pk)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_community_response_cache_version(sender, **kwargs):
+    if issubclass(sender, Community):
+        bump_version('community')
@@ -1,3 +1,276 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+
+from community.calendar import fold
+from community.models import Club, Event, CommunityEvent, Lab, Community
+from community.views import EventViewSet
+from membership.models import Membership
+from user.models import User
+
+BOB = {'username': 'bob', 'password': 'password303'}
+
+
+class EventListTest(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username=BOB['username'], password=BOB['password'])
+
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True)
+        self.event = Event.objects.create(name_th='งานรับน้อง', name_en='Freshmen Fair', **schedule)
+        self.community_event = CommunityEvent.objects.create(
+            name_th='แข่งหมากรุก', name_en='Chess Tournament', created_under=club, **schedule
+        )
+
+    def list_ids(self, query=''):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/community/event/{}'.format(query))
+        self.client.logout()
+
+        return response, {i['id'] for i in response.data['results']}
+
+    def test_list_standalone_events_by_default(self):
+        response, ids = self.list_ids()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, {self.event.id})
+
+    def test_list_event_kinds(self):
+        self.assertEqual(self.list_ids('?kind=community')[1], {self.community_event.id})
+        self.assertEqual(self.list_ids('?kind=all')[1], {self.event.id, self.community_event.id})
+
+    def test_event_kind_through_get_queryset(self):
+        # Filter backends and schema generators call get_queryset() without arguments
+        view = EventViewSet(action='list', request=Request(RequestFactory().get('/', {'kind': 'community'})))
+        self.assertEqual(set(view.get_queryset().values_list('id', flat=True)), {self.community_event.id})
+
+        view = EventViewSet(action='retrieve', request=Request(RequestFactory().get('/', {'kind': 'community'})))
+        self.assertEqual(set(view.get_queryset().values_list('id', flat=True)), {self.event.id})
+
+    def test_list_invalid_event_kind(self):
+        response = self.client.get('/api/community/event/?kind=unknown')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_community_event_from_event_list(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/community/event/{}/'.format(self.community_event.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommunitySearchTest(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username=BOB['username'], password=BOB['password'])
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุกสากล', name_en='International Chess Club',
+                                         description='Chess training and chess tournaments', is_official=True,
+                                         is_publicly_visible=True)
+        self.music = Club.objects.create(name_th='ชมรมดนตรีไทย', name_en='Thai Music Club',
+                                         description='Music, chess and more')
+        self.lab = Lab.objects.create(name_th='ห้องปฏิบัติการ', name_en='Vision Lab', tags='computer vision, หมากรุก')
+
+    def search_ids(self, query):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/community/search/{}'.format(query))
+        self.client.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [i['id'] for i in response.data['results']]
+
+    def test_search_thai_substring(self):
+        self.assertEqual(set(self.search_ids('?q=หมากรุก')), {self.chess.id, self.lab.id})
+
+    def test_search_ranks_results(self):
+        self.assertEqual(self.search_ids('?q=chess')[0], self.chess.id)
+        self.assertEqual(self.search_ids('?q=chess&limit=1'), [self.chess.id])
+
+    def test_search_short_terms(self):
+        self.assertEqual(set(self.search_ids('?q=ไทย')), {self.music.id})
+        self.assertEqual(set(self.search_ids('?q=ไท')), {self.music.id})
+
+    def test_search_follows_updates(self):
+        self.music.name_en = 'Thai Classical Music Club'
+        self.music.save()
+        self.lab.delete()
+
+        self.assertEqual(self.search_ids('?q=classical'), [self.music.id])
+        self.assertEqual(self.search_ids('?q=vision'), [])
+
+    def test_search_anonymous(self):
+        response = self.client.get('/api/community/search/?q=club')
+
+        self.assertEqual([i['id'] for i in response.data['results']], [self.chess.id])
+
+    def test_search_anonymous_visibility(self):
+        # Anonymous users find the communities the list views show them, e.g. neither unofficial clubs nor
+        # unapproved events
+        schedule = {
+            'location': 'Hall', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 1),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        Club.objects.create(name_th='ชมรมหมากรุกไทย', name_en='Thai Chess Club', is_publicly_visible=True)
+        Event.objects.create(
+            name_th='แข่งหมากรุก', name_en='Chess Open', is_publicly_visible=True, is_approved=False, **schedule
+        )
+        approved = Event.objects.create(
+            name_th='แข่งหมากรุกเร็ว', name_en='Chess Blitz', is_publicly_visible=True, is_approved=True, **schedule
+        )
+        self.lab.is_publicly_visible = True
+        self.lab.save()
+
+        response = self.client.get('/api/community/search/?q=หมากรุก')
+
+        self.assertEqual({i['id'] for i in response.data['results']}, {self.chess.id, approved.id, self.lab.id})
+
+    def test_search_filter_on_list(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/community/club/?search=chess')
+
+        self.assertEqual({i['id'] for i in response.data['results']}, {self.chess.id, self.music.id})
+
+
+class CommunityKindTest(APITestCase):
+    def setUp(self):
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True)
+        self.event = Event.objects.create(name_th='งานรับน้อง', name_en='Freshmen Fair', **schedule)
+        self.community_event = CommunityEvent.objects.create(
+            name_th='แข่งหมากรุก', name_en='Chess Tournament', created_under=self.club, **schedule
+        )
+        self.lab = Lab.objects.create(name_th='ห้องปฏิบัติการ', name_en='Vision Lab')
+
+    def test_kind_is_stored(self):
+        kinds = dict(Community.objects.values_list('id', 'kind'))
+
+        self.assertEqual(kinds, {
+            self.club.id: 'club', self.event.id: 'event', self.community_event.id: 'community_event',
+            self.lab.id: 'lab'
+        })
+
+    def test_kind_is_kept_when_saved_as_parent(self):
+        Event.objects.get(pk=self.community_event.id).save()
+
+        self.assertEqual(Community.objects.get(pk=self.community_event.id).kind, 'community_event')
+
+    def test_type_resolution_without_queries(self):
+        communities = list(Community.objects.order_by('id'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual([i.is_club for i in communities], [True, False, False, False])
+            self.assertEqual([i.is_event for i in communities], [False, True, True, False])
+            self.assertEqual([i.is_community_event for i in communities], [False, False, True, False])
+            self.assertEqual([i.is_lab for i in communities], [False, False, False, True])
+
+    def test_get_concrete(self):
+        community = Community.objects.get(pk=self.community_event.id)
+
+        self.assertIsInstance(community.get_concrete(), CommunityEvent)
+        self.assertEqual(community.get_concrete().created_under_id, self.club.id)
+
+
+class CalendarTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        self.club = Club.objects.create(
+            name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True, is_publicly_visible=True
+        )
+        self.event = Event.objects.create(
+            name_th='งานรับน้อง', name_en='Freshmen Fair, 2023', is_publicly_visible=True, is_approved=True, **schedule
+        )
+        self.community_event = CommunityEvent.objects.create(
+            name_th='แข่งหมากรุก', name_en='Chess Tournament', created_under=self.club, is_publicly_visible=True,
+            **schedule
+        )
+        self.hidden_event = Event.objects.create(name_th='งานลับ', name_en='Hidden Party', **schedule)
+
+    def get_calendar(self, path, status_code=status.HTTP_200_OK, **headers):
+        response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, status_code)
+
+        return response
+
+    def get_uids(self, response):
+        return [i.split(':')[1] for i in response.content.decode().split('\r\n') if i.startswith('UID:')]
+
+    def test_public_calendar(self):
+        response = self.get_calendar('/api/community/calendar.ics')
+        content = response.content.decode()
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(content.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(self.get_uids(response), [
+            'event-{}@clubs-and-events'.format(self.event.id),
+            'event-{}@clubs-and-events'.format(self.community_event.id),
+        ])
+        self.assertIn('SUMMARY:Freshmen Fair\\, 2023\r\n', content)
+        self.assertIn('DTSTART:20230801T090000Z\r\n', content)
+        self.assertIn('DTEND:20230802T170000Z\r\n', content)
+
+    def test_community_calendar(self):
+        response = self.get_calendar('/api/community/{}/calendar.ics'.format(self.club.id))
+        self.assertEqual(self.get_uids(response), ['event-{}@clubs-and-events'.format(self.community_event.id)])
+        self.assertIn('X-WR-CALNAME:Chess Club\r\n', response.content.decode())
+
+        self.get_calendar('/api/community/{}/calendar.ics'.format(self.hidden_event.id), status.HTTP_404_NOT_FOUND)
+
+    def test_user_calendar(self):
+        Membership.objects.create(user=self.bob, community=self.club, position=0)
+        Membership.objects.create(user=self.bob, community=self.hidden_event, position=0)
+
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        url = self.client.get('/api/community/calendar/me/').data['url']
+        self.client.logout()
+
+        response = self.get_calendar(url)
+        self.assertEqual(sorted(self.get_uids(response)), [
+            'event-{}@clubs-and-events'.format(self.community_event.id),
+            'event-{}@clubs-and-events'.format(self.hidden_event.id),
+        ])
+
+        # Leaving the club removes its events from the feed
+        Membership.objects.filter(community=self.club).get().delete()
+        response = self.get_calendar(url)
+        self.assertEqual(self.get_uids(response), ['event-{}@clubs-and-events'.format(self.hidden_event.id)])
+
+        self.get_calendar(url.replace('.ics', 'x.ics'), status.HTTP_404_NOT_FOUND)
+
+    def test_caching(self):
+        response = self.get_calendar('/api/community/calendar.ics')
+        etag = response['ETag']
+
+        # Unchanged feeds are neither queried nor regenerated
+        with self.assertNumQueries(0):
+            self.get_calendar('/api/community/calendar.ics', status.HTTP_304_NOT_MODIFIED, HTTP_IF_NONE_MATCH=etag)
+            response = self.get_calendar('/api/community/calendar.ics')
+        self.assertEqual(response['ETag'], etag)
+
+        self.event.location = 'Stadium'
+        self.event.save()
+
+        response = self.get_calendar('/api/community/calendar.ics', HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('LOCATION:Stadium\r\n', response.content.decode())
+
+    def test_fold(self):
+        line = 'SUMMARY:' + 'ชมรม' * 20
+        folded = fold(line)
+
+        self.assertTrue(all(len(i.encode()) <= 75 for i in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), line)
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from community.views import ClubViewSet, LabViewSet, EventViewSet, CommunityEventViewSet
+from community.views import ClubViewSet, LabViewSet, EventViewSet, CommunityEventViewSet, CommunitySearchAPIView
+from community.views import UserCalendarAPIView, public_calendar, community_calendar, user_calendar
 
 
 router = DefaultRouter()
@@ -11,5 +12,10 @@ router.register('event', EventViewSet)
 router.register('lab', LabViewSet)
 
 urlpatterns = [
+    path('search/', CommunitySearchAPIView.as_view()),
+    path('calendar.ics', public_calendar),
+    path('calendar/me/', UserCalendarAPIView.as_view()),
+    path('calendar/user/<int:pk>/<str:signature>.ics', user_calendar, name='user-calendar'),
+    path('<int:pk>/calendar.ics', community_calendar),
     path('', include(router.urls))
 ]
\ No newline at end of file
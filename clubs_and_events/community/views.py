@@ -1,25 +1,42 @@
-from rest_framework import filters, permissions, status, viewsets
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from rest_framework import generics, permissions, status, views, viewsets
+from rest_framework.pagination import _positive_int
 from rest_framework.response import Response
 
-from community.models import Club, Event, CommunityEvent, Lab
+from community.calendar import get_public_calendar, get_community_calendar, get_user_calendar
+from community.calendar import get_user_calendar_signature, is_valid_user_calendar_signature
+from community.models import Club, Event, CommunityEvent, Lab, Community
 from community.permissions import IsPubliclyVisibleCommunity
 from community.permissions import IsLeaderOfBaseCommunity, IsDeputyLeaderOfBaseCommunity, IsStaffOfBaseCommunity
 from community.permissions import IsDeletableClub, IsDeletableEvent, IsDeletableCommunityEvent, IsDeletableLab
 from community.serializers import OfficialClubSerializer, UnofficialClubSerializer
 from community.serializers import ApprovedEventSerializer, UnapprovedEventSerializer
 from community.serializers import ExistingCommunityEventSerializer, NotExistingCommunityEventSerializer
-from community.serializers import LabSerializer
+from community.search import CommunitySearchFilter, get_search_backend, get_terms
+from community.serializers import LabSerializer, CommunitySearchResultSerializer
+from core.cache import AnonymousResponseCacheMixin
+from core.conditional import ConditionalGetMixin
+from core.filters import FilterSpec, QueryFilter, QueryFilterBackend, boolean, date
 from core.permissions import IsLeaderOfCommunity, IsDeputyLeaderOfCommunity
-from core.utils import filter_queryset
 from membership.models import Membership
 from user.permissions import IsStudent, IsLecturer
 
 
-class ClubViewSet(viewsets.ModelViewSet):
+class ClubViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Club.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name_th', 'name_en', 'description')
+    filter_backends = (CommunitySearchFilter, QueryFilterBackend)
+    filter_spec = FilterSpec(
+        club_type=QueryFilter(int, is_foreign_key=True),
+        is_official=QueryFilter(boolean, lookups=('exact',)),
+        status=QueryFilter(choices=Club.STATUS),
+    )
+    cache_namespaces = ('community', 'category')
+    etag_namespaces = ('category',)
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -46,13 +63,12 @@ class ClubViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_publicly_visible=True, is_official=True)
 
-        queryset = filter_queryset(queryset, request, target_param='club_type', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='is_official', is_foreign_key=False)
-        queryset = filter_queryset(queryset, request, target_param='status', is_foreign_key=False)
+        queryset = self.filter_queryset(queryset)
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
@@ -71,17 +87,35 @@ class ClubViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Event.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name_th', 'name_en', 'description', 'location')
+    filter_backends = (CommunitySearchFilter, QueryFilterBackend)
+    filter_spec = FilterSpec(
+        event_type=QueryFilter(int, is_foreign_key=True),
+        event_series=QueryFilter(int, is_foreign_key=True),
+        is_approved=QueryFilter(boolean, lookups=('exact',)),
+        is_cancelled=QueryFilter(boolean, lookups=('exact',)),
+        start_date=QueryFilter(date, lookups=('exact', 'gt', 'gte', 'lt', 'lte', 'range')),
+        end_date=QueryFilter(date, lookups=('exact', 'gt', 'gte', 'lt', 'lte', 'range')),
+    )
+    etag_namespaces = ('category',)
+
+    # Event kinds available to the list, resolved as a join on the community event table instead of a second query
+    EVENT_KINDS = {
+        'standalone': {'communityevent__isnull': True},
+        'community': {'communityevent__isnull': False},
+        'all': {},
+    }
+
+    def get_event_kind(self):
+        # Only the list picks the kind, other actions resolve standalone events
+        if self.action == 'list' and self.request is not None:
+            return self.request.query_params.get('kind', 'standalone')
+        return 'standalone'
 
     def get_queryset(self):
-        community_event_list = [i.id for i in CommunityEvent.objects.all()]
-        event_list = [i.id for i in Event.objects.all() if i.id not in community_event_list]
-
-        return self.queryset.filter(pk__in=event_list)
+        return self.queryset.filter(**self.EVENT_KINDS[self.get_event_kind()])
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -103,19 +137,23 @@ class EventViewSet(viewsets.ModelViewSet):
         return ApprovedEventSerializer
 
     def list(self, request, *args, **kwargs):
+        if self.get_event_kind() not in self.EVENT_KINDS:
+            return Response(
+                {'error': 'Event kinds must be one of {}.'.format(', '.join(self.EVENT_KINDS))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         queryset = self.get_queryset()
 
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_publicly_visible=True, is_approved=True)
 
-        queryset = filter_queryset(queryset, request, target_param='event_type', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='event_series', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='is_approved', is_foreign_key=False)
-        queryset = filter_queryset(queryset, request, target_param='is_cancelled', is_foreign_key=False)
+        queryset = self.filter_queryset(queryset)
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
@@ -134,11 +172,21 @@ class EventViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CommunityEventViewSet(viewsets.ModelViewSet):
+class CommunityEventViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CommunityEvent.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name_th', 'name_en', 'description', 'location')
+    filter_backends = (CommunitySearchFilter, QueryFilterBackend)
+    filter_spec = FilterSpec(
+        event_type=QueryFilter(int, is_foreign_key=True),
+        event_series=QueryFilter(int, is_foreign_key=True),
+        is_approved=QueryFilter(boolean, lookups=('exact',)),
+        is_cancelled=QueryFilter(boolean, lookups=('exact',)),
+        start_date=QueryFilter(date, lookups=('exact', 'gt', 'gte', 'lt', 'lte', 'range')),
+        end_date=QueryFilter(date, lookups=('exact', 'gt', 'gte', 'lt', 'lte', 'range')),
+        created_under=QueryFilter(int, is_foreign_key=True),
+        allows_outside_participators=QueryFilter(boolean, lookups=('exact',)),
+    )
+    etag_namespaces = ('category',)
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -166,17 +214,12 @@ class CommunityEventViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_publicly_visible=True)
 
-        queryset = filter_queryset(queryset, request, target_param='event_type', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='event_series', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='is_approved', is_foreign_key=False)
-        queryset = filter_queryset(queryset, request, target_param='is_cancelled', is_foreign_key=False)
-        queryset = filter_queryset(queryset, request, target_param='created_under', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='allows_outside_participators',
-                                   is_foreign_key=False)
+        queryset = self.filter_queryset(queryset)
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
@@ -195,12 +238,15 @@ class CommunityEventViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class LabViewSet(viewsets.ModelViewSet):
+class LabViewSet(AnonymousResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Lab.objects.all()
     serializer_class = LabSerializer
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name_th', 'name_en', 'description', 'tags')
+    filter_backends = (CommunitySearchFilter, QueryFilterBackend)
+    filter_spec = FilterSpec(
+        status=QueryFilter(choices=Lab.STATUS),
+    )
+    cache_namespaces = ('community',)
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -219,11 +265,12 @@ class LabViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_publicly_visible=True)
 
-        queryset = filter_queryset(queryset, request, target_param='status', is_foreign_key=False)
+        queryset = self.filter_queryset(queryset)
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
@@ -239,4 +286,86 @@ class LabViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save(updated_by=request.user)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+# Communities listed to anonymous users by the list views of each kind
+ANONYMOUS_VISIBILITY = Q(is_publicly_visible=True) & (
+    Q(kind='club', club__is_official=True) | Q(kind='event', event__is_approved=True) |
+    Q(kind__in=('community_event', 'lab'))
+)
+
+
+class CommunitySearchAPIView(generics.ListAPIView):
+    queryset = Community.objects.all()
+    serializer_class = CommunitySearchResultSerializer
+    pagination_class = None
+    max_results = 50
+
+    def list(self, request, *args, **kwargs):
+        terms = get_terms(request.query_params.get('q', ''))
+        if len(terms) == 0:
+            return Response({'results': []})
+
+        try:
+            limit = _positive_int(request.query_params['limit'], strict=True, cutoff=self.max_results)
+        except (KeyError, ValueError):
+            limit = self.max_results
+
+        queryset = self.get_queryset()
+
+        if not self.request.user.is_authenticated:
+            queryset = queryset.filter(ANONYMOUS_VISIBILITY)
+
+        ranked_ids = get_search_backend().rank(queryset, terms, limit)
+        communities = Community.objects.in_bulk(ranked_ids)
+
+        serializer = self.get_serializer([communities[i] for i in ranked_ids if i in communities], many=True)
+
+        return Response({'results': serializer.data})
+
+
+def get_calendar_response(request, content, etag):
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="calendar.ics"'
+    response['ETag'] = etag
+    return response
+
+
+# Calendar feeds are plain views, calendar applications neither authenticate nor negotiate the content type
+
+@require_safe
+def public_calendar(request):
+    return get_calendar_response(request, *get_public_calendar())
+
+
+@require_safe
+def community_calendar(request, pk):
+    # Only publicly visible communities have a feed, their names are looked up only when the feed is regenerated
+    def get_name():
+        names = Community.objects.filter(pk=pk, is_publicly_visible=True).values_list('name_en', flat=True)
+        if len(names) == 0:
+            raise Http404
+        return names[0]
+
+    return get_calendar_response(request, *get_community_calendar(pk, get_name))
+
+
+@require_safe
+def user_calendar(request, pk, signature):
+    if not is_valid_user_calendar_signature(pk, signature):
+        raise Http404
+    return get_calendar_response(request, *get_user_calendar(pk))
+
+
+class UserCalendarAPIView(views.APIView):
+    # Gives the signed URL of the feed of the events of the requesting user
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        path = reverse('user-calendar', kwargs={
+            'pk': request.user.id, 'signature': get_user_calendar_signature(request.user.id)
+        })
+        return Response({'url': request.build_absolute_uri(path)})
@@ -1,5 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.models import Permission
 
+from core.models import StoredFile
 
-admin.site.register(Permission)
\ No newline at end of file
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'size', 'references', 'created_at']
+    readonly_fields = ['name', 'sha256', 'size', 'references', 'created_at']
+
+
+admin.site.register(Permission)
+admin.site.register(StoredFile, StoredFileAdmin)
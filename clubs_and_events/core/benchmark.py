@@ -0,0 +1,135 @@
+import math
+import time
+import tracemalloc
+from collections import Counter
+from urllib.parse import unquote
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+
+# Query strings of routes which need one to do any work
+ROUTE_QUERIES = {
+    '/api/community/search/': 'q=club',
+}
+
+
+def get_url_patterns(patterns=None, prefix=''):
+    # Yields (route, pattern) of every URL pattern, route being the concatenation of the patterns leading to it
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from get_url_patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern
+
+
+def get_targets(samples):
+    # Returns {route: [path]} of the GET routes under /api/, detail routes are given up to samples existing objects
+    targets = dict()
+
+    for route, pattern in get_url_patterns():
+        if not route.startswith('api/') or 'format' in pattern.pattern.regex.groupindex or pattern.name == 'api-root':
+            continue
+
+        callback = pattern.callback
+        actions = getattr(callback, 'actions', None)
+        view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+        if view_class is None or (actions is not None and 'get' not in actions) or \
+                (actions is None and not hasattr(view_class, 'get')):
+            continue
+
+        kwargs = set(pattern.pattern.regex.groupindex)
+        if len(kwargs) == 0:
+            path = reverse(pattern.name) if pattern.name else '/' + route
+            targets[path] = [path]
+        elif kwargs == {'pk'} and pattern.name and getattr(view_class, 'queryset', None) is not None:
+            pks = view_class.queryset.model.objects.order_by('-pk').values_list('pk', flat=True)[:samples]
+            if len(pks) > 0:
+                key = unquote(reverse(pattern.name, kwargs={'pk': '{pk}'}))
+                targets[key] = [reverse(pattern.name, kwargs={'pk': i}) for i in pks]
+
+    return targets
+
+
+def percentile(values, rank):
+    # Nearest-rank percentile of sorted values
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+def benchmark_route(client, paths, requests, cold=False):
+    query_string = ROUTE_QUERIES.get(paths[0], '')
+
+    # The peak memory is measured on a warm up request, tracing the allocations would distort the latencies
+    tracemalloc.start()
+    try:
+        client.get(paths[0], QUERY_STRING=query_string)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies = list()
+    query_counts = list()
+    statuses = Counter()
+
+    for index in range(requests):
+        if cold:
+            cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(paths[index % len(paths)], QUERY_STRING=query_string)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        query_counts.append(len(queries))
+        statuses[str(response.status_code)] += 1
+
+    latencies.sort()
+
+    return {
+        'requests': requests,
+        'statuses': dict(statuses),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'queries': round(sum(query_counts) / len(query_counts), 2),
+        'max_queries': max(query_counts),
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def run_benchmarks(requests, user=None, host='localhost', samples=20, cold=False, route_filter=None):
+    client = Client(SERVER_NAME=host)
+    if user is not None:
+        client.force_login(user)
+
+    results = dict()
+    for route, paths in sorted(get_targets(samples).items()):
+        if route_filter is None or route_filter in route:
+            results['GET {}'.format(route)] = benchmark_route(client, paths, requests, cold=cold)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Routes whose p95 latency grew by more than threshold (a ratio) or which run more queries than in the baseline
+    comparison = dict()
+
+    for route, result in results.items():
+        if route not in baseline:
+            continue
+
+        base = baseline[route]
+        change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] > 0 else 0
+        comparison[route] = {
+            'p95_ms': [base['p95_ms'], result['p95_ms']],
+            'p95_change': round(change, 3),
+            'queries': [base['queries'], result['queries']],
+            'regression': change > threshold or result['queries'] > base['queries'],
+        }
+
+    return comparison
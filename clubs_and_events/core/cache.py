@@ -0,0 +1,97 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+
+# Responses to anonymous users are the same for every anonymous user, they are cached with the versions of the
+# namespaces they depend on. Saving or deleting a model of a namespace bumps its version, which makes every cached
+# response depending on it stale.
+
+def get_version_key(namespace):
+    return 'response-version:{}'.format(namespace)
+
+
+def get_versions(namespaces):
+    versions = cache.get_many([get_version_key(i) for i in namespaces])
+    return tuple(versions.get(get_version_key(i), 0) for i in namespaces)
+
+
+def bump_version(namespace):
+    key = get_version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+class AnonymousResponseCacheMixin:
+    # Serves GET list and retrieve requests of anonymous users from the cache. Entries stay in the cache for
+    # RESPONSE_CACHE_STALE_TIMEOUT seconds but are only fresh for RESPONSE_CACHE_TIMEOUT seconds and while the versions
+    # of cache_namespaces are unchanged. Only the worker taking the lock of a stale entry rebuilds it, the others keep
+    # serving the stale entry in the meantime.
+    cache_namespaces = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        # The handler is looked up by dispatch() after authentication, which is when anonymous users are known
+        if request.method == 'GET' and self.action in ('list', 'retrieve') and not request.user.is_authenticated:
+            handler = self.get
+            self.get = lambda request, *args, **kwargs: self.get_cached_response(handler, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        key = '{}.{}:{}:{}'.format(
+            self.__class__.__module__, self.__class__.__name__, request.accepted_renderer.format,
+            request.get_full_path()
+        )
+        return 'response:{}'.format(hashlib.sha1(key.encode()).hexdigest())
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        lock_key = '{}:lock'.format(key)
+        versions = get_versions(self.cache_namespaces)
+
+        entry = cache.get(key)
+        if entry is not None and entry['versions'] == versions and entry['expires_at'] > time.time():
+            return self.build_cached_response(request, entry)
+
+        if not cache.add(lock_key, 1, timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT) and entry is not None:
+            return self.build_cached_response(request, entry)
+
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            cache.delete(lock_key)
+            raise
+
+        if response.status_code != 200:
+            cache.delete(lock_key)
+            return response
+
+        def store(response):
+            cache.set(key, {
+                'versions': versions,
+                'expires_at': time.time() + settings.RESPONSE_CACHE_TIMEOUT,
+                'content': response.content,
+                'headers': {i: response[i] for i in ('Content-Type', 'ETag', 'Last-Modified') if i in response},
+            }, timeout=settings.RESPONSE_CACHE_STALE_TIMEOUT)
+            cache.delete(lock_key)
+
+        response.add_post_render_callback(store)
+        return response
+
+    def build_cached_response(self, request, entry):
+        etag = entry['headers'].get('ETag')
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = HttpResponse(entry['content'])
+
+        for header, value in entry['headers'].items():
+            if response.status_code == 200 or header != 'Content-Type':
+                response[header] = value
+        return response
@@ -0,0 +1,83 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from core.cache import get_versions
+
+
+class NotModified(APIException):
+    status_code = 304
+
+
+def get_etag(*values, weak=False):
+    digest = hashlib.sha1(':'.join(str(i) for i in values).encode()).hexdigest()
+    return '{}"{}"'.format('W/' * weak, digest)
+
+
+class ConditionalGetMixin:
+    # Answers conditional GET requests before anything is serialized. Detail responses have a strong ETag of the id
+    # and last modification time of the object, list responses a weak ETag of an aggregate of the filtered queryset
+    # computed in paginate_queryset(), which every list() calls before serializing. The user is part of both since
+    # the content of responses depends on the permissions of the user.
+    last_modified_field = 'updated_at'
+    # Versions of core.cache namespaces which the responses depend on besides the model itself
+    etag_namespaces = ()
+
+    def get_etag_values(self, instance):
+        return instance.pk, getattr(instance, self.last_modified_field)
+
+    def get_list_aggregates(self):
+        return {'last_modified': Max(self.last_modified_field), 'count': Count('pk')}
+
+    def evaluate_preconditions(self, etag, last_modified):
+        request = self.request._request
+        self.conditional_headers = {'ETag': etag}
+        if last_modified is not None:
+            self.conditional_headers['Last-Modified'] = http_date(last_modified.timestamp())
+
+        timestamp = None if last_modified is None else int(last_modified.timestamp())
+        if request.method in ('GET', 'HEAD') and get_conditional_response(request, etag, timestamp) is not None:
+            raise NotModified()
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.last_modified_field)
+        self.evaluate_preconditions(
+            get_etag(
+                instance._meta.label, *self.get_etag_values(instance), *get_versions(self.etag_namespaces),
+                request.user.pk
+            ),
+            last_modified
+        )
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def paginate_queryset(self, queryset):
+        if self.request.method in ('GET', 'HEAD'):
+            aggregates = queryset.order_by().aggregate(**self.get_list_aggregates())
+            etag = get_etag(
+                queryset.model._meta.label, *sorted(aggregates.items()), *get_versions(self.etag_namespaces),
+                self.request.user.pk, self.request.get_full_path(), weak=True
+            )
+            self.evaluate_preconditions(etag, aggregates['last_modified'])
+        return super().paginate_queryset(queryset)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            response = Response(status=NotModified.status_code)
+            for header, value in self.conditional_headers.items():
+                response[header] = value
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code == 200:
+            for header, value in getattr(self, 'conditional_headers', dict()).items():
+                response[header] = value
+        return response
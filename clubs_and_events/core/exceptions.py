@@ -0,0 +1,42 @@
+import functools
+
+from django.apps import apps
+from django.db import IntegrityError
+from django.db.models import UniqueConstraint
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as default_exception_handler, set_rollback
+
+
+@functools.lru_cache(maxsize=None)
+def get_conflict_constraints():
+    # Partial unique constraints (e.g. a single pending request of a user to a community) as (name, SQLite message).
+    # PostgreSQL names the violated constraint, SQLite only the columns of its unique index.
+    constraints = list()
+
+    for model in apps.get_models():
+        for constraint in model._meta.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.condition is not None:
+                columns = ', '.join(
+                    '{}.{}'.format(model._meta.db_table, model._meta.get_field(i).column) for i in constraint.fields
+                )
+                constraints.append((constraint.name, 'UNIQUE constraint failed: {}'.format(columns)))
+
+    return tuple(constraints)
+
+
+def is_conflict(exc):
+    message = str(exc)
+    return any(name in message or sqlite_message == message for name, sqlite_message in get_conflict_constraints())
+
+
+def exception_handler(exc, context):
+    # Database constraints are the last line of the validations, e.g. two concurrent requests passing the check for a
+    # pending request of the same user. Violations of those constraints are reported as a conflict, other integrity
+    # errors (e.g. NOT NULL or foreign keys) are bugs and stay server errors.
+    if isinstance(exc, IntegrityError) and is_conflict(exc):
+        set_rollback()
+        return Response(
+            {'detail': 'The request conflicts with the current state of the resource.'}, status=status.HTTP_409_CONFLICT
+        )
+    return default_exception_handler(exc, context)
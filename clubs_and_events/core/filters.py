@@ -0,0 +1,108 @@
+import datetime
+
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from community.models import Community
+
+
+def boolean(value):
+    if value.lower() in ('true', '1'):
+        return True
+    elif value.lower() in ('false', '0'):
+        return False
+    raise ValueError(value)
+
+
+def date(value):
+    return datetime.date.fromisoformat(value)
+
+
+class QueryFilter:
+    # A filterable query parameter: how to coerce its value, whether it refers to a foreign key and which lookups are
+    # allowed on it. A comma separated value on the plain parameter is treated as __in if the in lookup is allowed.
+    def __init__(self, coerce=str, is_foreign_key=False, lookups=('exact', 'in'), choices=None, field=None):
+        self.coerce = coerce
+        self.is_foreign_key = is_foreign_key
+        self.lookups = lookups
+        self.choices = None if choices is None else {i[0] for i in choices}
+        self.field = field
+
+    def to_python(self, value):
+        value = self.coerce(value.strip())
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(value)
+        return value
+
+
+class FilterSpec:
+    # Compiles a set of QueryFilter into a {query parameter: (filter keyword, is_list, filter)} table when the view
+    # class is defined, so filtering a request is a dictionary lookup per parameter and a single .filter() call.
+    def __init__(self, **filters):
+        self.params = dict()
+
+        for name, query_filter in filters.items():
+            field = (query_filter.field or name) + '_id' * query_filter.is_foreign_key
+
+            for lookup in query_filter.lookups:
+                if lookup == 'exact':
+                    # Plain parameters allowing the in lookup are only lists if the value contains a comma
+                    is_list = None if 'in' in query_filter.lookups else False
+                    self.params[name] = (field, is_list, query_filter)
+                else:
+                    is_list = lookup in ('in', 'range')
+                    self.params['{}__{}'.format(name, lookup)] = ('{}__{}'.format(field, lookup), is_list, query_filter)
+
+    def filter_queryset(self, queryset, request):
+        kwargs = dict()
+        errors = dict()
+
+        for param, value in request.query_params.items():
+            try:
+                keyword, is_list, query_filter = self.params[param]
+            except KeyError:
+                continue
+
+            if is_list is None:
+                is_list = ',' in value
+                if is_list:
+                    keyword += '__in'
+
+            try:
+                if not is_list:
+                    kwargs[keyword] = query_filter.to_python(value)
+                else:
+                    values = [query_filter.to_python(i) for i in value.split(',')]
+                    if keyword.endswith('__range') and len(values) != 2:
+                        raise ValueError(value)
+                    kwargs[keyword] = values
+            except (TypeError, ValueError):
+                errors[param] = ['"{}" is not a valid value.'.format(value)]
+
+        if len(errors) > 0:
+            raise ValidationError(errors)
+
+        if len(kwargs) == 0:
+            return queryset
+        return queryset.filter(**kwargs)
+
+
+class QueryFilterBackend(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        filter_spec = getattr(view, 'filter_spec', None)
+        if filter_spec is None:
+            return queryset
+        return filter_spec.filter_queryset(queryset, request)
+
+
+class VisibilityFilterBackend(BaseFilterBackend):
+    # Limits anonymous users to rows of publicly visible communities as a single EXISTS subquery. The view names the
+    # path from its model to the community in visibility_field, e.g. 'album__community' for album images. Applies to
+    # detail views as well since get_object() filters the queryset, hidden rows are not found.
+    def filter_queryset(self, request, queryset, view):
+        if request.user.is_authenticated:
+            return queryset
+
+        visible = Community.objects.filter(pk=OuterRef(view.visibility_field), is_publicly_visible=True)
+        return queryset.filter(Exists(visible))
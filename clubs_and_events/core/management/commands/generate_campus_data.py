@@ -0,0 +1,227 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from asset.models import Announcement, Album, Comment
+from category.models import ClubType, EventType, EventSeries
+from community.models import Club, Event, CommunityEvent, Lab
+from membership.models import Request, Invitation, Membership
+from user.models import User
+
+
+# Numbers of objects at scale 1
+COUNTS = {
+    'users': 12000,
+    'clubs': 2000,
+    'events': 1000,
+    'labs': 500,
+    'community_events': 1500,
+    'memberships_per_user': 10,
+    'requests': 20000,
+    'invitations': 20000,
+    'announcements': 5000,
+    'albums': 3000,
+    'comments': 30000,
+}
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic campus of users, communities, memberships and assets for benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1, help='Multiplies the number of every object.')
+        parser.add_argument('--prefix', default='bench', help='Prefix of the usernames and community names.')
+        parser.add_argument('--password', default='password', help='Password of every generated user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        counts = {i: max(1, round(count * options['scale'])) for i, count in COUNTS.items()}
+        counts['memberships_per_user'] = COUNTS['memberships_per_user']
+
+        with transaction.atomic():
+            users = self.create_users(counts['users'], options['password'])
+            communities = self.create_communities(counts, users)
+            members = self.create_memberships(users, communities, counts['memberships_per_user'])
+            self.create_requests_and_invitations(users, communities, members, counts)
+            self.create_assets(users, communities, counts)
+
+    def log(self, text):
+        self.stdout.write(text)
+        self.stdout.flush()
+
+    def create_users(self, count, password):
+        # Hashing is the slow part of creating users, every user shares the same hash
+        password = make_password(password)
+        users = [
+            User(username='{}{:06d}'.format(self.prefix, i), name='{} Student {}'.format(self.prefix, i),
+                 password=password)
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        self.log('Created {} users.'.format(len(users)))
+
+        # Primary keys are not set on bulk created objects on every backend, the users are read back
+        return list(User.objects.filter(username__startswith=self.prefix).order_by('pk').values_list('id', flat=True))
+
+    def get_schedule(self):
+        start_date = datetime.date(2023, 6, 1) + datetime.timedelta(days=self.random.randrange(365))
+        return {
+            'location': 'Building {}'.format(self.random.randrange(1, 40)),
+            'start_date': start_date,
+            'end_date': start_date + datetime.timedelta(days=self.random.randrange(3)),
+            'start_time': datetime.time(self.random.randrange(8, 13)),
+            'end_time': datetime.time(self.random.randrange(13, 20)),
+        }
+
+    def create_communities(self, counts, users):
+        # Communities use multi-table inheritance, which bulk_create does not support
+        club_types = [
+            ClubType.objects.create(title_th='ประเภท {}'.format(i), title_en='Type {}'.format(i)).id
+            for i in range(5)
+        ]
+        event_types = [
+            EventType.objects.create(title_th='ประเภท {}'.format(i), title_en='Type {}'.format(i)).id
+            for i in range(5)
+        ]
+        event_series = [
+            EventSeries.objects.create(title_th='ชุด {}'.format(i), title_en='Series {}'.format(i)).id
+            for i in range(5)
+        ]
+
+        communities = {'club': list(), 'event': list(), 'lab': list(), 'community_event': list()}
+        bases = list()
+
+        for i in range(counts['clubs']):
+            is_official = i % 2 == 0
+            club = Club.objects.create(
+                name_th='{} ชมรม {}'.format(self.prefix, i), name_en='{} Club {}'.format(self.prefix, i),
+                description='Club {} of the synthetic campus.'.format(i), club_type_id=self.random.choice(club_types),
+                is_official=is_official, is_publicly_visible=is_official, created_by_id=self.random.choice(users)
+            )
+            communities['club'].append(club.id)
+            if is_official:
+                bases.append(club.id)
+
+        for i in range(counts['labs']):
+            lab = Lab.objects.create(
+                name_th='{} แล็บ {}'.format(self.prefix, i), name_en='{} Lab {}'.format(self.prefix, i),
+                tags='research,lab{}'.format(i % 10), is_publicly_visible=True, created_by_id=self.random.choice(users)
+            )
+            communities['lab'].append(lab.id)
+            bases.append(lab.id)
+
+        for i in range(counts['events']):
+            event = Event.objects.create(
+                name_th='{} งาน {}'.format(self.prefix, i), name_en='{} Event {}'.format(self.prefix, i),
+                event_type_id=self.random.choice(event_types), event_series_id=self.random.choice(event_series),
+                is_approved=i % 5 != 0, is_publicly_visible=i % 3 != 0, created_by_id=self.random.choice(users),
+                **self.get_schedule()
+            )
+            communities['event'].append(event.id)
+
+        for i in range(counts['community_events']):
+            community_event = CommunityEvent.objects.create(
+                name_th='{} กิจกรรม {}'.format(self.prefix, i),
+                name_en='{} Community Event {}'.format(self.prefix, i),
+                created_under_id=self.random.choice(bases), allows_outside_participators=i % 2 == 0,
+                is_publicly_visible=i % 3 != 0, created_by_id=self.random.choice(users), **self.get_schedule()
+            )
+            communities['community_event'].append(community_event.id)
+
+        self.log('Created {} communities.'.format(sum(len(i) for i in communities.values())))
+
+        return communities
+
+    def create_memberships(self, users, communities, per_user):
+        # The first member of each community is its leader, the next ones its deputy leader and staff
+        community_ids = [i for ids in communities.values() for i in ids]
+        members = {i: list() for i in community_ids}
+        memberships = list()
+
+        for user_id in users:
+            for community_id in self.random.sample(community_ids, min(per_user, len(community_ids))):
+                position = max(0, 3 - len(members[community_id]))
+                status = self.random.choices(('A', 'R', 'L'), weights=(90, 7, 3))[0] if position == 0 else 'A'
+                members[community_id].append(user_id)
+                memberships.append(Membership(
+                    user_id=user_id, community_id=community_id, position=position, status=status,
+                    created_by_id=user_id, updated_by_id=user_id
+                ))
+
+        Membership.objects.bulk_create(memberships, batch_size=BATCH_SIZE)
+        self.log('Created {} memberships.'.format(len(memberships)))
+
+        return members
+
+    def get_outsider_pairs(self, users, communities, members, count):
+        # Distinct (user, community) pairs of users who are not members of the community
+        community_ids = [i for ids in communities.values() for i in ids]
+        member_sets = {i: set(ids) for i, ids in members.items()}
+        pairs = set()
+
+        for _ in range(count * 2):
+            pair = (self.random.choice(users), self.random.choice(community_ids))
+            if pair[0] not in member_sets[pair[1]]:
+                pairs.add(pair)
+            if len(pairs) == count:
+                break
+
+        return list(pairs)
+
+    def create_requests_and_invitations(self, users, communities, members, counts):
+        pairs = self.get_outsider_pairs(users, communities, members, counts['requests'] + counts['invitations'])
+        self.random.shuffle(pairs)
+        request_pairs, invitation_pairs = pairs[:counts['requests']], pairs[counts['requests']:]
+
+        requests = [
+            Request(user_id=user_id, community_id=community_id, updated_by_id=user_id,
+                    status=self.random.choices(('W', 'A', 'D'), weights=(60, 25, 15))[0])
+            for user_id, community_id in request_pairs
+        ]
+        Request.objects.bulk_create(requests, batch_size=BATCH_SIZE)
+
+        # Invitations are sent by the leaders
+        invitations = [
+            Invitation(community_id=community_id, invitor_id=(members[community_id] or [None])[0], invitee_id=user_id,
+                       status=self.random.choices(('W', 'A', 'D'), weights=(60, 25, 15))[0])
+            for user_id, community_id in invitation_pairs
+        ]
+        Invitation.objects.bulk_create(invitations, batch_size=BATCH_SIZE)
+
+        self.log('Created {} requests and {} invitations.'.format(len(requests), len(invitations)))
+
+    def create_assets(self, users, communities, counts):
+        community_ids = [i for ids in communities.values() for i in ids]
+        event_ids = communities['event'] + communities['community_event']
+
+        announcements = [
+            Announcement(text='Announcement {} of the synthetic campus.'.format(i),
+                         community_id=self.random.choice(community_ids), created_by_id=self.random.choice(users))
+            for i in range(counts['announcements'])
+        ]
+        Announcement.objects.bulk_create(announcements, batch_size=BATCH_SIZE)
+
+        albums = [
+            Album(name='Album {}'.format(i), community_id=self.random.choice(community_ids),
+                  created_by_id=self.random.choice(users))
+            for i in range(counts['albums'])
+        ]
+        Album.objects.bulk_create(albums, batch_size=BATCH_SIZE)
+
+        comments = [
+            Comment(text='Comment {}'.format(i), written_by='Visitor {}'.format(i % 500),
+                    event_id=self.random.choice(event_ids), created_by_id=self.random.choice(users))
+            for i in range(counts['comments'])
+        ]
+        Comment.objects.bulk_create(comments, batch_size=BATCH_SIZE)
+
+        self.log('Created {} announcements, {} albums and {} comments.'.format(
+            len(announcements), len(albums), len(comments)
+        ))
@@ -0,0 +1,76 @@
+import json
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmark import compare, run_benchmarks
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = 'Runs every GET route of the API through the test client and reports latencies, queries and memory as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per route.')
+        parser.add_argument('--samples', type=int, default=20, help='Objects requested per detail route.')
+        parser.add_argument('--user', help='Username of the user making the requests, anonymous by default.')
+        parser.add_argument('--host', default='localhost', help='Host of the requests, must be in ALLOWED_HOSTS.')
+        parser.add_argument('--route', help='Only benchmarks the routes containing this text.')
+        parser.add_argument('--cold', action='store_true', help='Clears the cache before every request.')
+        parser.add_argument('--output', help='File the report is written to, the standard output by default.')
+        parser.add_argument('--baseline', help='Report of a previous run to compare with.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Growth of the p95 latency over the baseline considered a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exits with an error if any route regressed from the baseline.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('User {} does not exist.'.format(options['user']))
+
+        # Without DEBUG the host of the test client has to be allowed explicitly
+        allowed_hosts = settings.ALLOWED_HOSTS
+        if not settings.DEBUG and options['host'] not in allowed_hosts and '*' not in allowed_hosts:
+            self.stderr.write('Host {} is not in ALLOWED_HOSTS, requests may fail.'.format(options['host']))
+
+        results = run_benchmarks(
+            options['requests'], user=user, host=options['host'], samples=options['samples'], cold=options['cold'],
+            route_filter=options['route']
+        )
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'user': options['user'],
+                'cold': options['cold'],
+            },
+            'routes': results,
+        }
+
+        regressions = list()
+        if options['baseline'] is not None:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['routes']
+            report['comparison'] = compare(results, baseline, options['threshold'])
+            regressions = [i for i, comparison in report['comparison'].items() if comparison['regression']]
+
+        content = json.dumps(report, indent=2, sort_keys=True)
+        if options['output'] is None:
+            self.stdout.write(content)
+        else:
+            with open(options['output'], 'w') as file:
+                file.write(content)
+
+        for route in regressions:
+            self.stderr.write('Regression: {}'.format(route))
+        if options['fail_on_regression'] and len(regressions) > 0:
+            raise CommandError('{} routes regressed from the baseline.'.format(len(regressions)))
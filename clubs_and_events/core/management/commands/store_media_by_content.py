@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Moves files uploaded before the content addressed storage into it, storing duplicates once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Deletes the original files once moved.')
+
+    def handle(self, *args, **options):
+        count = 0
+
+        for model in apps.get_models():
+            for field in getattr(model, '_local_stored_file_fields', ()):
+                storage = model._meta.get_field(field).storage
+                queryset = model.objects.exclude(**{field: ''}).exclude(**{field + '__isnull': True})
+                queryset = queryset.exclude(**{field + '__startswith': ContentAddressedStorage.directory + '/'})
+
+                for pk, name in queryset.values_list('pk', field).iterator():
+                    try:
+                        with storage.open(name, 'rb') as file:
+                            stored_name = storage.save(name, file)
+                    except OSError as error:
+                        self.stderr.write('{} {}: {}'.format(model._meta.label, pk, error))
+                        continue
+
+                    model.objects.filter(pk=pk).update(**{field: stored_name})
+                    if options['delete']:
+                        # Bypasses the reference counting, the original file is not tracked
+                        storage.delete_file(name)
+                    count += 1
+
+        self.stdout.write('Stored {} files.'.format(count))
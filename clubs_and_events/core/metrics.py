@@ -0,0 +1,224 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, +Inf is implied
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = (
+    ('http_request_duration_seconds', 'Duration of requests.', DURATION_BUCKETS),
+    ('db_queries_per_request', 'Number of database queries run by requests.', QUERY_COUNT_BUCKETS),
+    ('db_time_seconds', 'Time spent by requests in database queries.', DURATION_BUCKETS),
+    ('serializer_time_seconds', 'Time spent by requests in serializing data.', DURATION_BUCKETS),
+)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    # Measurements of a single request, queries are recorded through the execute wrapper of every database connection
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            # Queries are parameterized, the SQL itself is the signature of the query
+            self.queries[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.queries.items() if count > 1}
+
+
+class Registry:
+    # Histograms per route of the requests served by this process, every worker process exposes its own
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = dict()
+        self.duplicates = Counter()
+
+    def observe(self, labels, values, duplicates):
+        with self.lock:
+            for (name, _, buckets), value in zip(HISTOGRAMS, values):
+                histogram = self.histograms.setdefault((name, labels), [[0] * len(buckets), 0, 0])
+                for index, bound in enumerate(buckets):
+                    if value <= bound:
+                        histogram[0][index] += 1
+                histogram[1] += value
+                histogram[2] += 1
+            self.duplicates[labels] += duplicates
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.duplicates.clear()
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = list()
+
+        with self.lock:
+            for name, description, buckets in HISTOGRAMS:
+                lines += ['# HELP {} {}'.format(name, description), '# TYPE {} histogram'.format(name)]
+                for (histogram_name, labels), (counts, total, count) in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    labels = format_labels(labels)
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, bucket_count))
+                    lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, count))
+                    lines.append('{}_sum{{{}}} {}'.format(name, labels, total))
+                    lines.append('{}_count{{{}}} {}'.format(name, labels, count))
+
+            lines += [
+                '# HELP db_duplicate_queries_total Queries run more than once with the same SQL within a request.',
+                '# TYPE db_duplicate_queries_total counter',
+            ]
+            for labels, count in sorted(self.duplicates.items()):
+                lines.append('db_duplicate_queries_total{{{}}} {}'.format(format_labels(labels), count))
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def format_labels(labels):
+    method, route = labels
+    return 'method="{}",route="{}"'.format(method, route.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def get_route(request):
+    # Routes are the URL patterns rather than the paths so that the number of label values is bounded
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name
+
+
+def timed_data(fget):
+    # Wraps BaseSerializer.data, which Serializer.data and ListSerializer.data call. Nested serializers are
+    # represented through to_representation() so only the outermost serializers are measured.
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth > 0:
+            return fget(self)
+
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializer_depth -= 1
+
+    data.is_timed = True
+    return property(data)
+
+
+def instrument_serializers():
+    if not getattr(serializers.BaseSerializer.data.fget, 'is_timed', False):
+        serializers.BaseSerializer.data = timed_data(serializers.BaseSerializer.data.fget)
+
+
+@contextmanager
+def measure(metrics):
+    # Records the queries and serializers run within the block into metrics
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics))
+            yield
+    finally:
+        _current.reset(token)
+
+
+class MeasuredStream:
+    # Content of a streaming response, whose queries (e.g. of a server side cursor) run as the content is consumed
+    # after the middleware returned. Every chunk is produced under measure() and the request is recorded on close(),
+    # which the server calls once the response is sent or the client went away.
+    def __init__(self, content, metrics, finish):
+        self.content = iter(content)
+        self.metrics = metrics
+        self.finish = finish
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with measure(self.metrics):
+            return next(self.content)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.finish()
+
+
+class RequestMetricsMiddleware:
+    # Records the queries, database time and serializer time of every request into the per route histograms of the
+    # registry, served by core.views.metrics. In debug mode they are also sent as response headers and duplicated
+    # queries (e.g. an object fetched twice by the same view) are logged. Streaming responses are recorded when they
+    # are closed and have no headers, which are sent before their content.
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+
+        with measure(metrics):
+            response = self.get_response(request)
+
+        if response.streaming:
+            response.streaming_content = MeasuredStream(
+                response.streaming_content, metrics, lambda: self.record(request, metrics, start)
+            )
+        else:
+            self.record(request, metrics, start, response)
+
+        return response
+
+    def record(self, request, metrics, start, response=None):
+        duration = time.perf_counter() - start
+        duplicates = metrics.duplicates
+        # Executions beyond the first of each duplicated query
+        duplicate_count = sum(duplicates.values()) - len(duplicates)
+        labels = (request.method, get_route(request))
+        registry.observe(
+            labels, (duration, metrics.query_count, metrics.db_time, metrics.serializer_time), duplicate_count
+        )
+
+        if settings.DEBUG:
+            if response is not None:
+                response['X-DB-Query-Count'] = str(metrics.query_count)
+                response['X-DB-Time-Ms'] = '{:.1f}'.format(metrics.db_time * 1000)
+                response['X-DB-Duplicate-Queries'] = str(duplicate_count)
+                response['X-Serializer-Time-Ms'] = '{:.1f}'.format(metrics.serializer_time * 1000)
+            for sql, count in duplicates.items():
+                logger.warning('%s %s ran %d times: %s', request.method, labels[1], count, sql)
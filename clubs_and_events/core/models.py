@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    # A file of the content addressed storage, shared by every file field referring to the same content
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '{} ({} references)'.format(self.name, self.references)
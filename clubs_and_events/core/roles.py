@@ -0,0 +1,39 @@
+from membership.models import Membership
+from user.claims import get_access_claims
+
+
+LEADER = (3,)
+DEPUTY_LEADER = (2, 3)
+STAFF = (1, 2, 3)
+MEMBER = (0, 1, 2, 3)
+
+
+def get_active_positions(request):
+    # Loads the active memberships of the requesting user once per request as a {community_id: position} map, so that
+    # every permission class and serializer validation in the same request answers from it instead of querying.
+    # Reads authenticated by a signed access token answer from the positions of its claims.
+    claims = get_access_claims(request)
+    if claims is not None:
+        return claims.positions
+
+    holder = getattr(request, '_request', request)
+
+    try:
+        return holder.active_positions
+    except AttributeError:
+        pass
+
+    if request.user.is_authenticated:
+        positions = dict(
+            Membership.objects.filter(user_id=request.user.id, status='A').values_list('community_id', 'position')
+        )
+    else:
+        positions = dict()
+
+    holder.active_positions = positions
+
+    return positions
+
+
+def has_active_position(request, community_id, positions=MEMBER):
+    return get_active_positions(request).get(community_id) in positions
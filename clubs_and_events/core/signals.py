@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_init, post_save
+
+from core.storage import ContentAddressedStorage
+
+
+# Keeps the reference counts of the content addressed storage, a reference is added when a file is saved to the
+# storage and released here when the row is deleted or the file of the field is replaced.
+
+def get_stored_file_fields(fields):
+    return [i.attname for i in fields if isinstance(i, FileField) and isinstance(i.storage, ContentAddressedStorage)]
+
+
+def get_loaded_names(instance, fields):
+    # Only the names loaded from the database (or assigned as names) are tracked, files given to the constructor are
+    # not stored yet and deferred fields are not loaded.
+    names = dict()
+    for field in fields:
+        value = instance.__dict__.get(field)
+        if isinstance(value, str):
+            names[field] = value
+        elif value is not None and getattr(value, '_committed', False):
+            names[field] = value.name
+    return names
+
+
+def release(model, names):
+    for field, name in names:
+        if name:
+            model._meta.get_field(field).storage.delete(name)
+
+
+def remember_stored_files(sender, instance, **kwargs):
+    instance._stored_files = get_loaded_names(instance, sender._stored_file_fields)
+
+
+def release_replaced_stored_files(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    current = get_loaded_names(instance, sender._stored_file_fields)
+    release(sender, [(i, j) for i, j in instance._stored_files.items() if current.get(i, j) != j])
+    instance._stored_files = current
+
+
+def release_deleted_stored_files(sender, instance, **kwargs):
+    # Deleting a child of a multi-table inheritance also deletes (and signals) the parent, which releases its fields
+    release(sender, get_loaded_names(instance, sender._local_stored_file_fields).items())
+
+
+def connect_stored_file_signals():
+    # Connected per model so that models without such fields keep fast deletes and plain instantiation
+    for model in apps.get_models():
+        fields = get_stored_file_fields(model._meta.concrete_fields)
+        if len(fields) == 0:
+            continue
+
+        model._stored_file_fields = fields
+        model._local_stored_file_fields = get_stored_file_fields(model._meta.local_concrete_fields)
+        post_init.connect(remember_stored_files, sender=model)
+        post_save.connect(release_replaced_stored_files, sender=model)
+        post_delete.connect(release_deleted_stored_files, sender=model)
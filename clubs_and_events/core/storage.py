@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.models import StoredFile
+
+
+def get_content_hash(content):
+    sha256 = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Stores files by the SHA-256 of their content under cas/<2 hex>/<2 hex>/<hash>.<extension>, the directory given
+    # by upload_to is ignored. Saving content which is already stored only adds a reference to its StoredFile, the
+    # file is deleted once its last reference is released.
+    directory = 'cas'
+
+    def get_hashed_name(self, name, sha256):
+        extension = os.path.splitext(name)[1].lower()
+        return '{}/{}/{}/{}{}'.format(self.directory, sha256[:2], sha256[2:4], sha256, extension)
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from the content in _save(), equal names are meant to be shared. A hashed name is only
+        # asked for when the file was written concurrently, with the same content.
+        if name.startswith(self.directory + '/'):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        sha256 = get_content_hash(content)
+        name = self.get_hashed_name(name, sha256)
+
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name).update(references=F('references') + 1) == 1:
+                return name
+
+            if not self.exists(name):
+                try:
+                    super()._save(name, content)
+                except FileExistsError:
+                    pass
+
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, sha256=sha256, size=content.size, references=1)
+            except IntegrityError:
+                # Stored concurrently by another request
+                StoredFile.objects.filter(name=name).update(references=F('references') + 1)
+
+        return name
+
+    def delete(self, name):
+        # Releases a reference, files which are not tracked (stored before this storage was used) are left alone
+        with transaction.atomic():
+            stored_file = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored_file is None:
+                return
+
+            if stored_file.references > 1:
+                StoredFile.objects.filter(pk=stored_file.pk).update(references=F('references') - 1)
+                return
+
+            stored_file.delete()
+            transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name):
+        # The same content may have been stored again since the last reference was released
+        if not StoredFile.objects.filter(name=name).exists():
+            self.delete_file(name)
+
+    def delete_file(self, name):
+        # Deletes the file regardless of its references
+        super().delete(name)
@@ -0,0 +1,448 @@
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from asset.models import Announcement, Album, AlbumImage, Comment
+from community.models import Club, Event
+from community.views import ClubViewSet
+from core.cache import bump_version
+from core.metrics import registry
+from core.models import StoredFile
+from core.roles import DEPUTY_LEADER, LEADER, get_active_positions, has_active_position
+from membership.models import Membership, CustomMembershipLabel
+from user.models import User
+
+
+class ActivePositionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bob', password='password303')
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+        self.retired_club = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club')
+        Membership.objects.create(user=self.user, community=self.club, position=2, status='A')
+        Membership.objects.create(user=self.user, community=self.retired_club, position=3, status='R')
+
+    def test_positions_are_loaded_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_active_positions(request), {self.club.id: 2})
+            self.assertTrue(has_active_position(request, self.club.id, DEPUTY_LEADER))
+            self.assertFalse(has_active_position(request, self.club.id, LEADER))
+            self.assertFalse(has_active_position(request, self.retired_club.id))
+
+    def test_anonymous_user_has_no_positions(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_active_positions(request), dict())
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username='bob', password='password303')
+        self.club_ids = [
+            Club.objects.create(name_th='ชมรม {}'.format(i), name_en='Club {}'.format(i)).id for i in range(5)
+        ]
+
+    def test_follow_cursors_through_every_page(self):
+        self.client.login(username='bob', password='password303')
+
+        ids = list()
+        url = '/api/community/club/?page_size=2'
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [i['id'] for i in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(ids, sorted(self.club_ids, reverse=True))
+
+    def test_approximate_count(self):
+        self.client.login(username='bob', password='password303')
+        response = self.client.get('/api/community/club/?page_size=2&count=approximate')
+
+        self.assertEqual(response.data['count'], 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/community/club/?cursor=invalid')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class QueryFilterTest(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username='bob', password='password303')
+        self.recruiting = Club.objects.create(name_th='ชมรม 1', name_en='Club 1', status='R')
+        self.closed = Club.objects.create(name_th='ชมรม 2', name_en='Club 2', status='C')
+        self.disbanded = Club.objects.create(name_th='ชมรม 3', name_en='Club 3', status='D', is_official=True)
+        self.client.login(username='bob', password='password303')
+
+    def list_ids(self, query):
+        response = self.client.get('/api/community/club/{}'.format(query))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return {i['id'] for i in response.data['results']}
+
+    def test_filter_exact_and_in(self):
+        self.assertEqual(self.list_ids('?status=C'), {self.closed.id})
+        self.assertEqual(self.list_ids('?status=R,C'), {self.recruiting.id, self.closed.id})
+        self.assertEqual(self.list_ids('?status__in=C,D&is_official=true'), {self.disbanded.id})
+
+    def test_filter_invalid_value(self):
+        for query in ('?status=X', '?is_official=maybe', '?club_type=one'):
+            response = self.client.get('/api/community/club/{}'.format(query))
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_date_range(self):
+        schedule = {'location': 'Hall', 'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)}
+        early = Event.objects.create(name_th='งาน 1', name_en='Event 1', start_date=datetime.date(2023, 1, 10),
+                                     end_date=datetime.date(2023, 1, 10), **schedule)
+        late = Event.objects.create(name_th='งาน 2', name_en='Event 2', start_date=datetime.date(2023, 3, 10),
+                                    end_date=datetime.date(2023, 3, 12), **schedule)
+
+        response = self.client.get('/api/community/event/?start_date__gte=2023-02-01')
+        self.assertEqual({i['id'] for i in response.data['results']}, {late.id})
+
+        response = self.client.get('/api/community/event/?start_date__range=2023-01-01,2023-01-31')
+        self.assertEqual({i['id'] for i in response.data['results']}, {early.id})
+
+        response = self.client.get('/api/community/event/?start_date__range=2023-01-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_announcement(self, name, content):
+        return Announcement.objects.create(text=name, community=self.club, image=SimpleUploadedFile(name, content))
+
+    def test_duplicates_are_stored_once(self):
+        first = self.create_announcement('poster.png', b'poster')
+        second = self.create_announcement('POSTER_COPY.PNG', b'poster')
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(StoredFile.objects.get().references, 2)
+        self.assertEqual(sum(len(i[2]) for i in os.walk(self.media_root)), 1)
+
+    def test_file_is_deleted_with_last_reference(self):
+        first = self.create_announcement('poster.png', b'poster')
+        second = self.create_announcement('poster.png', b'poster')
+        path = first.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Announcement.objects.get(pk=first.id).delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().references, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Announcement.objects.get(pk=second.id).delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_replaced_file_is_released(self):
+        announcement = Announcement.objects.get(pk=self.create_announcement('poster.png', b'poster').id)
+        path = announcement.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            announcement.image = SimpleUploadedFile('flyer.png', b'flyer')
+            announcement.save()
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(StoredFile.objects.values_list('name', flat=True)), [announcement.image.name])
+
+    def test_deleting_community_releases_logo(self):
+        Club.objects.filter(pk=self.club.id).delete()
+        club = Club.objects.create(
+            name_th='ชมรมดนตรี', name_en='Music Club', logo=SimpleUploadedFile('logo.png', b'logo')
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Club.objects.get(pk=club.id).delete()
+
+        self.assertFalse(StoredFile.objects.exists())
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True,
+                                        is_publicly_visible=True)
+
+    def test_retrieve_not_modified(self):
+        response = self.client.get('/api/community/club/{}/'.format(self.club.id))
+        etag = response['ETag']
+
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get('/api/community/club/{}/'.format(self.club.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        self.club.description = 'Chess training'
+        self.club.save()
+
+        response = self.client.get('/api/community/club/{}/'.format(self.club.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        response = self.client.get('/api/community/club/')
+        etag = response['ETag']
+
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get('/api/community/club/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get('/api/community/club/?is_official=true', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club', is_official=True, is_publicly_visible=True)
+
+        response = self.client.get('/api/community/club/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_list_etag_depends_on_user(self):
+        etag = self.client.get('/api/community/club/')['ETag']
+
+        User.objects.create_user(username='bob', password='password303')
+        self.client.login(username='bob', password='password303')
+        response = self.client.get('/api/community/club/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AnonymousResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True,
+                                        is_publicly_visible=True)
+
+    def list_names(self):
+        return [i['name_en'] for i in self.client.get('/api/community/club/').json()['results']]
+
+    def test_list_is_cached(self):
+        self.assertEqual(self.list_names(), ['Chess Club'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_names(), ['Chess Club'])
+
+    def test_cached_response_is_conditional(self):
+        etag = self.client.get('/api/community/club/{}/'.format(self.club.id))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/community/club/{}/'.format(self.club.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_saving_invalidates_cache(self):
+        self.list_names()
+
+        self.club.name_en = 'International Chess Club'
+        self.club.save()
+
+        self.assertEqual(self.list_names(), ['International Chess Club'])
+
+    def test_stale_response_is_served_while_rebuilding(self):
+        self.list_names()
+
+        # Another worker is rebuilding the response
+        Club.objects.filter(pk=self.club.id).update(name_en='International Chess Club')
+        bump_version('community')
+        cache.add('{}:lock'.format(self.get_cache_key('/api/community/club/')), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_names(), ['Chess Club'])
+
+    def test_authenticated_responses_are_not_cached(self):
+        self.list_names()
+        Club.objects.filter(pk=self.club.id).update(name_en='International Chess Club')
+
+        User.objects.create_user(username='bob', password='password303')
+        self.client.login(username='bob', password='password303')
+
+        self.assertEqual(self.list_names(), ['International Chess Club'])
+
+    def get_cache_key(self, path):
+        request = RequestFactory().get(path)
+        request.accepted_renderer = JSONRenderer()
+        return ClubViewSet().get_response_cache_key(request)
+
+
+class VisibilityFilterTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='bob', password='password303')
+        self.visible, self.hidden = dict(), dict()
+
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        for objects, name, is_publicly_visible in ((self.visible, 'Fair', True), (self.hidden, 'Camp', False)):
+            event = Event.objects.create(name_th=name, name_en=name, is_publicly_visible=is_publicly_visible,
+                                         **schedule)
+            user = User.objects.create_user(username=name.lower(), password='password303')
+            album = Album.objects.create(name=name, community=event)
+            membership = Membership.objects.create(user=user, community=event)
+
+            objects['announcement'] = Announcement.objects.create(text=name, community=event).id
+            objects['album'] = album.id
+            objects['album/image'] = AlbumImage.objects.create(album=album, image='photo.jpg').id
+            objects['comment'] = Comment.objects.create(text=name, written_by=name, event=event).id
+            objects['membership'] = membership.id
+            objects['custom-label'] = CustomMembershipLabel.objects.create(membership=membership, custom_label=name).id
+
+    def get_path(self, resource):
+        return '/api/{}/{}/'.format('membership' if resource in ('membership', 'custom-label') else 'asset', resource)
+
+    def test_anonymous_lists(self):
+        for resource, id in self.visible.items():
+            with self.subTest(resource=resource), self.assertNumQueries(2):
+                response = self.client.get(self.get_path(resource))
+                self.assertEqual([i['id'] for i in response.data['results']], [id])
+
+    def test_anonymous_detail(self):
+        for resource in self.visible:
+            with self.subTest(resource=resource):
+                path = self.get_path(resource)
+                response = self.client.get('{}{}/'.format(path, self.visible[resource]))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+                response = self.client.get('{}{}/'.format(path, self.hidden[resource]))
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_authenticated_lists(self):
+        self.client.login(username='bob', password='password303')
+
+        for resource in self.visible:
+            with self.subTest(resource=resource):
+                response = self.client.get(self.get_path(resource))
+                self.assertEqual(len(response.data['results']), 2)
+
+
+class RequestMetricsTest(APITestCase):
+    def setUp(self):
+        User.objects.create_user(username='bob', password='password303')
+        User.objects.create_user(username='admin', password='password303', is_staff=True)
+        self.club = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_publicly_visible=True)
+        registry.clear()
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        self.client.login(username='bob', password='password303')
+        with self.assertLogs('core.metrics', level='WARNING'):
+            response = self.client.get('/api/community/club/{}/'.format(self.club.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(int(response['X-DB-Query-Count']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('X-Serializer-Time-Ms', response)
+        # get_serializer_class() fetches the club before retrieve() does
+        self.assertGreater(int(response['X-DB-Duplicate-Queries']), 0)
+
+    def test_no_headers_without_debug(self):
+        response = self.client.get('/api/community/club/')
+
+        self.assertNotIn('X-DB-Query-Count', response)
+
+    def test_metrics(self):
+        self.client.get('/api/community/club/')
+        self.client.get('/api/community/club/')
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        lines = response.content.decode().splitlines()
+        counts = [i for i in lines if i.startswith('http_request_duration_seconds_count{method="GET"')]
+        self.assertEqual(len(counts), 1)
+        self.assertTrue(counts[0].endswith(' 2'))
+        self.assertIn('# TYPE db_queries_per_request histogram', lines)
+
+    def test_streaming_response(self):
+        Membership.objects.create(user=User.objects.get(username='bob'), community=self.club, position=3)
+        response = self.client.get('/api/membership/membership/export/', {'community': self.club.id})
+
+        # Recorded once the content is consumed, with the queries of the rows
+        self.assertNotIn('export', registry.render())
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+        lines = registry.render().splitlines()
+        counts = [i for i in lines if i.startswith('db_queries_per_request_count') and 'export' in i]
+        sums = [i for i in lines if i.startswith('db_queries_per_request_sum') and 'export' in i]
+        self.assertEqual(len(counts), 1)
+        self.assertTrue(counts[0].endswith(' 1'))
+        self.assertGreater(float(sums[0].split()[-1]), 0)
+
+    def test_metrics_access(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.login(username='admin', password='password303')
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_generate_and_benchmark(self):
+        call_command('generate_campus_data', scale=0.002, stdout=io.StringIO())
+
+        self.assertEqual(Club.objects.count(), 4)
+        self.assertEqual(Membership.objects.count(), User.objects.count() * 10)
+        self.assertTrue(Membership.objects.filter(position=3).exists())
+
+        baseline = os.path.join(self.directory, 'baseline.json')
+        call_command(
+            'run_benchmarks', requests=3, samples=2, host='testserver', output=baseline,
+            stdout=io.StringIO()
+        )
+        with open(baseline) as file:
+            routes = json.load(file)['routes']
+
+        self.assertIn('GET /api/community/club/', routes)
+        self.assertIn('GET /api/community/club/{pk}/', routes)
+        for result in routes.values():
+            # Detail routes include communities which are not publicly visible
+            self.assertTrue(all(int(i) < 500 for i in result['statuses']))
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+
+        report = os.path.join(self.directory, 'report.json')
+        call_command(
+            'run_benchmarks', requests=3, samples=2, host='testserver', route='/community/club/', output=report,
+            baseline=baseline, threshold=100, stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        with open(report) as file:
+            comparison = json.load(file)['comparison']
+
+        self.assertEqual(set(comparison), {'GET /api/community/club/', 'GET /api/community/club/{pk}/'})
@@ -1,18 +1,5 @@
-from django.core.exceptions import ValidationError
-
-
 def truncate(text, max_length=64):
     if len(text) <= max_length:
         return text
     return text[:max_length - 3] + '...'
 
-
-def filter_queryset(queryset, request, target_param=None, is_foreign_key=False):
-    try:
-        query = request.query_params.get(target_param)
-        if query is not None:
-            queryset = eval('queryset.filter({}{}=query)'.format(target_param, '_id' * is_foreign_key))
-    except (ValueError, ValidationError):
-        queryset = None
-
-    return queryset
\ No newline at end of file
@@ -0,0 +1,157 @@
+from django.utils.translation import gettext_lazy as _
+
+from community.models import CommunityEvent
+from core.roles import STAFF, has_active_position
+from membership.models import Request, Invitation, Membership
+
+
+# Rules shared by the single and the batch endpoints, evaluated for a set of communities (or invitees) with a fixed
+# number of queries. Errors are returned as {id: (message, code)} and only the first broken rule of each is reported.
+
+REQUEST_ERRORS = {
+    'community_not_accepting_requests': _(
+        'Requests are not able to be made to the community which doesn\'t accept requests.'
+    ),
+    'outside_participator_disallowed': _(
+        'Requests are not able to be made to the community event that does not allow outside participators.'
+    ),
+    'member_already_exists': _(
+        'Requests are not able to be made to the community which the user is already a member.'
+    ),
+    'request_already_exists': _(
+        'Requests are not able to be made to the community if the user already has a pending request.'
+    ),
+    'invitation_already_exists': _(
+        'Requests are not able to be made if the pending invitation to the community exists.'
+    ),
+}
+
+INVITATION_ERRORS = {
+    'outside_participator_disallowed': _(
+        'Invitation are not able to be made from the community event that does not allow outside participators.'
+    ),
+    'permission_denied': _(
+        'Invitation are not able to be made from the community if the invitor is not a staff.'
+    ),
+    'member_already_exists': _(
+        'Invitation are not able to be made from the community which the invitee is already a member.'
+    ),
+    'invitation_already_exists': _(
+        'Invitations are not able to be made from the community if the invitee already has a pending request.'
+    ),
+    'request_already_exists': _(
+        'Invitations are not able to be made from the community if the user already has a pending request.'
+    ),
+}
+
+
+def get_community_events(communities):
+    # {community_id: (created_under_id, allows_outside_participators)} of the community events among the communities
+    ids = [i.id for i in communities if i.is_community_event]
+    if len(ids) == 0:
+        return dict()
+
+    return {
+        i[0]: i[1:] for i in CommunityEvent.objects.filter(pk__in=ids).values_list(
+            'id', 'created_under_id', 'allows_outside_participators'
+        )
+    }
+
+
+def get_request_errors(request, communities):
+    # Validates requests of the requesting user to the communities
+    user_id = request.user.id
+    ids = [i.id for i in communities]
+
+    community_events = get_community_events(communities)
+    members = set(Membership.objects.filter(
+        user_id=user_id, community_id__in=ids, status__in=('A', 'R')
+    ).values_list('community_id', flat=True))
+    pending_requests = set(Request.objects.filter(
+        user_id=user_id, community_id__in=ids, status='W'
+    ).values_list('community_id', flat=True))
+    pending_invitations = set(Invitation.objects.filter(
+        invitee_id=user_id, community_id__in=ids, status='W'
+    ).values_list('community_id', flat=True))
+
+    errors = dict()
+
+    for community in communities:
+        code = None
+
+        # Case 1: Community does not accept requests
+        if not community.is_accepting_requests:
+            code = 'community_not_accepting_requests'
+
+        # Case 2: Community is community event and doesn't allow outside participators
+        elif community.id in community_events and not community_events[community.id][1] and \
+                not has_active_position(request, community_events[community.id][0], STAFF):
+            code = 'outside_participator_disallowed'
+
+        # Case 3: Already a member
+        elif community.id in members:
+            code = 'member_already_exists'
+
+        # Case 4: Already has a pending request
+        elif community.id in pending_requests:
+            code = 'request_already_exists'
+
+        # Case 5: Already has a pending invitation
+        elif community.id in pending_invitations:
+            code = 'invitation_already_exists'
+
+        if code is not None:
+            errors[community.id] = (REQUEST_ERRORS[code], code)
+
+    return errors
+
+
+def get_invitation_errors(request, community, invitee_ids):
+    # Validates invitations of the requesting user to the community, invitee_ids is a list or a queryset of user ids
+    community_event = get_community_events([community]).get(community.id)
+    outsiders = set()
+    if community_event is not None and not community_event[1]:
+        outsiders = set(invitee_ids) - set(Membership.objects.filter(
+            user_id__in=invitee_ids, community_id=community_event[0], status__in=('A', 'R')
+        ).values_list('user_id', flat=True))
+
+    is_staff = has_active_position(request, community.id, STAFF)
+    members = set(Membership.objects.filter(
+        user_id__in=invitee_ids, community_id=community.id, status__in=('A', 'R')
+    ).values_list('user_id', flat=True))
+    pending_invitations = set(Invitation.objects.filter(
+        invitee_id__in=invitee_ids, community_id=community.id, status='W'
+    ).values_list('invitee_id', flat=True))
+    pending_requests = set(Request.objects.filter(
+        user_id__in=invitee_ids, community_id=community.id, status='W'
+    ).values_list('user_id', flat=True))
+
+    errors = dict()
+
+    for invitee_id in invitee_ids:
+        code = None
+
+        # Case 1: Community is community event and doesn't allow outside participators
+        if invitee_id in outsiders:
+            code = 'outside_participator_disallowed'
+
+        # Case 2: Not a staff
+        elif not is_staff:
+            code = 'permission_denied'
+
+        # Case 3: Already a member
+        elif invitee_id in members:
+            code = 'member_already_exists'
+
+        # Case 4: Already has a pending invitation
+        elif invitee_id in pending_invitations:
+            code = 'invitation_already_exists'
+
+        # Case 5: Already has a pending request
+        elif invitee_id in pending_requests:
+            code = 'request_already_exists'
+
+        if code is not None:
+            errors[invitee_id] = (INVITATION_ERRORS[code], code)
+
+    return errors
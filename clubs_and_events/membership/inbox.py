@@ -0,0 +1,60 @@
+from django.db.models import Exists, OuterRef, Q
+
+from core.roles import MEMBER, STAFF
+from membership.models import Request, Invitation, Membership
+
+
+def has_position_in_community(user_id, positions):
+    # Correlated EXISTS on the community of the outer row, evaluated by the database per row
+    return Exists(Membership.objects.filter(
+        user_id=user_id, community_id=OuterRef('community_id'), status='A', position__in=positions
+    ))
+
+
+def get_visible_requests(user_id):
+    # Requests sent by the user or to communities the user is an active member of
+    return Request.objects.filter(Q(user_id=user_id) | Q(has_position_in_community(user_id, MEMBER)))
+
+
+def get_visible_invitations(user_id):
+    # Invitations sent or received by the user or of communities the user is an active member of
+    return Invitation.objects.filter(
+        Q(invitor_id=user_id) | Q(invitee_id=user_id) | Q(has_position_in_community(user_id, MEMBER))
+    )
+
+
+def get_inbox(user_id):
+    # Loads the pending requests and invitations concerning the user with one query per model, then splits them into
+    # sent, received and to moderate (requests to communities the user is a staff of).
+    requests = Request.objects.filter(status='W').annotate(is_moderated=has_position_in_community(user_id, STAFF))
+    requests = requests.filter(Q(user_id=user_id) | Q(is_moderated=True)).order_by('-created_at', '-id')
+
+    invitations = Invitation.objects.filter(status='W').annotate(
+        is_moderated=has_position_in_community(user_id, STAFF)
+    )
+    invitations = invitations.filter(Q(invitor_id=user_id) | Q(invitee_id=user_id) | Q(is_moderated=True))
+    invitations = invitations.order_by('-created_at', '-id')
+
+    inbox = {
+        'sent': {'requests': list(), 'invitations': list()},
+        'received': {'invitations': list()},
+        'to_moderate': {'requests': list()},
+    }
+    counts = dict()
+
+    for request in requests:
+        if request.user_id == user_id:
+            inbox['sent']['requests'].append(request)
+        if request.is_moderated:
+            inbox['to_moderate']['requests'].append(request)
+            counts.setdefault(request.community_id, {'requests': 0, 'invitations': 0})['requests'] += 1
+
+    for invitation in invitations:
+        if invitation.invitor_id == user_id:
+            inbox['sent']['invitations'].append(invitation)
+        if invitation.invitee_id == user_id:
+            inbox['received']['invitations'].append(invitation)
+        if invitation.is_moderated:
+            counts.setdefault(invitation.community_id, {'requests': 0, 'invitations': 0})['invitations'] += 1
+
+    return inbox, counts
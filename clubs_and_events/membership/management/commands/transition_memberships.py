@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from membership.models import Membership
+from membership.transitions import apply_transitions
+
+
+class Command(BaseCommand):
+    help = 'Updates the memberships of communities at once, e.g. retires every active member at the end of a semester.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('community', nargs='+', type=int, help='Ids of the communities.')
+        parser.add_argument('--from-status', default='A', choices=[i[0] for i in Membership.STATUS],
+                            help='Status of the memberships to update, active by default.')
+        parser.add_argument('--status', choices=[i[0] for i in Membership.STATUS], help='New status.')
+        parser.add_argument('--position', type=int, help='New position.')
+
+    def handle(self, *args, **options):
+        if options['status'] is None and options['position'] is None:
+            raise CommandError('Either --status or --position must be given.')
+
+        ids = Membership.objects.filter(
+            community_id__in=options['community'], status=options['from_status']
+        ).values_list('id', flat=True)
+        memberships, errors = apply_transitions({i: (options['position'], options['status']) for i in ids})
+
+        if len(errors) > 0:
+            for membership_id, (message, code) in errors.items():
+                self.stderr.write('Membership {}: {}'.format(membership_id, message))
+            raise CommandError('No memberships were updated.')
+
+        self.stdout.write('Updated {} memberships.'.format(len(memberships)))
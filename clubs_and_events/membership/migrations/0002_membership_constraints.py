@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def resolve_duplicates(apps, schema_editor):
+    Request = apps.get_model('membership', 'Request')
+    Invitation = apps.get_model('membership', 'Invitation')
+    Membership = apps.get_model('membership', 'Membership')
+
+    # The first pending request or invitation of a pair is kept, the later ones are declined
+    for model, user_field in ((Request, 'user_id'), (Invitation, 'invitee_id')):
+        duplicates = model.objects.filter(status='W').values(user_field, 'community_id').annotate(
+            count=Count('id')
+        ).filter(count__gt=1)
+        for duplicate in duplicates:
+            ids = model.objects.filter(
+                status='W', community_id=duplicate['community_id'], **{user_field: duplicate[user_field]}
+            ).order_by('created_at', 'id').values_list('id', flat=True)
+            model.objects.filter(pk__in=list(ids)[1:]).update(status='D')
+
+    # The active or retired membership with the highest position is kept, the others are marked as left
+    duplicates = Membership.objects.filter(status__in=('A', 'R')).values('user_id', 'community_id').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        ids = Membership.objects.filter(
+            status__in=('A', 'R'), user_id=duplicate['user_id'], community_id=duplicate['community_id']
+        ).order_by('status', '-position', '-updated_at').values_list('id', flat=True)
+        Membership.objects.filter(pk__in=list(ids)[1:]).update(status='L')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='request',
+            constraint=models.UniqueConstraint(condition=models.Q(status='W'), fields=('user', 'community'), name='unique_pending_request'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['community', 'status', 'user'], name='request_community_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='invitation',
+            constraint=models.UniqueConstraint(condition=models.Q(status='W'), fields=('invitee', 'community'), name='unique_pending_invitation'),
+        ),
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['community', 'status', 'invitee'], name='invitation_community_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='membership',
+            constraint=models.UniqueConstraint(condition=models.Q(status__in=('A', 'R')), fields=('user', 'community'), name='unique_current_membership'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['user', 'status', 'community', 'position'], name='membership_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['community', 'status', 'position'], name='membership_community_idx'),
+        ),
+    ]
@@ -2,7 +2,7 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import gettext as _
 
-from community.models import Community, Lab, CommunityEvent
+from community.models import Community
 from user.models import User
 
 
@@ -21,6 +21,16 @@ class Request(models.Model):
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
                                    related_name='request_updated_by')
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'community'), condition=models.Q(status='W'), name='unique_pending_request'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('community', 'status', 'user'), name='request_community_idx'),
+        )
+
 
 class Invitation(models.Model):
     STATUS = (
@@ -37,6 +47,16 @@ class Invitation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('invitee', 'community'), condition=models.Q(status='W'), name='unique_pending_invitation'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('community', 'status', 'invitee'), name='invitation_community_idx'),
+        )
+
 
 class Advisory(models.Model):
     advisor = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -56,20 +76,14 @@ class Advisory(models.Model):
         if self.start_date > self.end_date:
             errors.append(ValidationError(_('Start date must come before the end date.'), code='date_period_error'))
 
-        try:
-            if CommunityEvent.objects.get(pk=self.community):
-                errors.append(ValidationError(
-                    _('Advisories are not applicable on community events.'),
-                    code='advisory_feature'
-                ))
-        except CommunityEvent.DoesNotExist:
-            pass
-
-        try:
-            if Lab.objects.get(pk=self.community):
-                errors.append(ValidationError(_('Advisories are not applicable on labs.'), code='advisory_feature'))
-        except Lab.DoesNotExist:
-            pass
+        if self.community.is_community_event:
+            errors.append(ValidationError(
+                _('Advisories are not applicable on community events.'),
+                code='advisory_feature'
+            ))
+
+        if self.community.is_lab:
+            errors.append(ValidationError(_('Advisories are not applicable on labs.'), code='advisory_feature'))
 
         if len(errors) > 0:
             raise ValidationError(errors)
@@ -101,6 +115,20 @@ class Membership(models.Model):
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
                                    related_name='membership_updated_by')
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'community'), condition=models.Q(status__in=('A', 'R')),
+                name='unique_current_membership'
+            ),
+        )
+        indexes = (
+            # Active positions of a user (core.roles) and membership checks of a user in communities
+            models.Index(fields=('user', 'status', 'community', 'position'), name='membership_user_idx'),
+            # Members of a community by status and position
+            models.Index(fields=('community', 'status', 'position'), name='membership_community_idx'),
+        )
+
     def clean(self):
         errors = list()
 
@@ -1,6 +1,6 @@
 from rest_framework import permissions
 
-from membership.models import Membership
+from core.roles import DEPUTY_LEADER, has_active_position
 
 
 class IsRequestOwner(permissions.BasePermission):
@@ -25,9 +25,7 @@ class IsAbleToViewRequestList(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: Request
         # Condition: If is membership of the community or is the sender of the request
-        membership = Membership.objects.filter(user_id=request.user.id, community_id=obj.community.id, status='A')
-
-        return len(membership) == 1 or request.user.id == obj.user.id
+        return has_active_position(request, obj.community_id) or request.user.id == obj.user_id
 
 
 class IsInvitationInvitor(permissions.BasePermission):
@@ -58,22 +56,17 @@ class IsAbleToViewInvitationList(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: Invitation
         # Condition: If is membership of the community or is the invitee of the invitation
-        membership = Membership.objects.filter(user_id=request.user.id, community_id=obj.community.id, status='A')
-
-        return len(membership) == 1 or request.user.id == obj.invitee.id
+        return has_active_position(request, obj.community_id) or request.user.id == obj.invitee_id
 
 
 class IsAbleToUpdateMembership(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Object class: Membership
         # Case 1: Leaving and Retiring, must be the membership owner.
-        is_membership_owner = request.user.id == obj.user.id and obj.position not in ('L', 'X')
+        is_membership_owner = request.user.id == obj.user_id and obj.position not in ('L', 'X')
 
         # Case 2: Member Removal and Position Assignation, must be an active deputy leader of the community.
-        membership = Membership.objects.filter(
-            user_id=request.user.id, community_id=obj.community.id, position__in=(2, 3), status='A'
-        )
-        is_deputy_leader_of_that_community = len(membership) == 1
+        is_deputy_leader_of_that_community = has_active_position(request, obj.community_id, DEPUTY_LEADER)
 
         # Both Cases: Leader memberships are not able to be updated by anyone.
         object_is_not_leader = obj.position != 3
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from membership.models import Membership
+from user.claims import bump_user_version
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def bump_member_version(sender, instance, **kwargs):
+    # Access tokens carry the active positions of their user, bulk creations and updates bump the versions themselves
+    bump_user_version(instance.user_id)
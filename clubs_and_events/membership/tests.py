@@ -1,3 +1,474 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from community.models import Club, CommunityEvent
+from core.exceptions import is_conflict
+from membership.models import Request, Invitation, Membership
+from user.models import User
+
+BOB = {'username': 'bob', 'password': 'password303'}
+
+
+class InboxTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.joe = User.objects.create_user(username='joe', password='password303')
+        self.ann = User.objects.create_user(username='ann', password='password303')
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+        self.music = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club')
+        self.art = Club.objects.create(name_th='ชมรมศิลปะ', name_en='Art Club')
+        Membership.objects.create(user=self.bob, community=self.chess, position=1)
+        Membership.objects.create(user=self.bob, community=self.art, position=0)
+        Membership.objects.create(user=self.ann, community=self.music, position=3)
+
+        # To moderate: pending requests to the club Bob is a staff of
+        self.joe_request = Request.objects.create(user=self.joe, community=self.chess)
+        self.ann_request = Request.objects.create(user=self.ann, community=self.chess)
+        Request.objects.create(user=self.joe, community=self.chess, status='D')
+        Request.objects.create(user=self.joe, community=self.art)
+
+        # Sent and received
+        self.bob_request = Request.objects.create(user=self.bob, community=self.music)
+        self.bob_invitation = Invitation.objects.create(community=self.chess, invitor=self.bob, invitee=self.ann)
+        self.ann_invitation = Invitation.objects.create(community=self.music, invitor=self.ann, invitee=self.bob)
+        Invitation.objects.create(community=self.music, invitor=self.ann, invitee=self.joe)
+
+    def get_inbox(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/membership/inbox/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response.data
+
+    def test_inbox(self):
+        inbox = self.get_inbox()
+
+        self.assertEqual([i['id'] for i in inbox['sent']['requests']], [self.bob_request.id])
+        self.assertEqual([i['id'] for i in inbox['sent']['invitations']], [self.bob_invitation.id])
+        self.assertEqual([i['id'] for i in inbox['received']['invitations']], [self.ann_invitation.id])
+        self.assertEqual(
+            [i['id'] for i in inbox['to_moderate']['requests']], [self.ann_request.id, self.joe_request.id]
+        )
+        self.assertEqual(inbox['pending_counts'], [{'community': self.chess.id, 'requests': 2, 'invitations': 1}])
+
+    def test_inbox_queries(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        # Session, user, requests and invitations
+        with self.assertNumQueries(4):
+            self.client.get('/api/membership/inbox/')
+
+    def test_inbox_anonymous(self):
+        response = self.client.get('/api/membership/inbox/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_request_list(self):
+        hidden_request = Request.objects.create(user=self.joe, community=self.music)
+
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.get('/api/membership/request/')
+
+        # Requests of every community Bob is a member of and his own
+        ids = {i['id'] for i in response.data['results']}
+        self.assertEqual(len(ids), 5)
+        self.assertNotIn(hidden_request.id, ids)
+
+
+class RequestBatchTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        ann = User.objects.create_user(username='ann', password='password303')
+
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True)
+        self.music = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club')
+        self.art = Club.objects.create(name_th='ชมรมศิลปะ', name_en='Art Club')
+        self.film = Club.objects.create(name_th='ชมรมภาพยนตร์', name_en='Film Club')
+        self.closed = Club.objects.create(name_th='ชมรมปิด', name_en='Closed Club', is_accepting_requests=False)
+        self.tournament = CommunityEvent.objects.create(
+            name_th='แข่งหมากรุก', name_en='Chess Tournament', created_under=self.chess,
+            allows_outside_participators=True, **schedule
+        )
+        self.practice = CommunityEvent.objects.create(
+            name_th='ซ้อมหมากรุก', name_en='Chess Practice', created_under=self.chess, **schedule
+        )
+
+        Membership.objects.create(user=self.bob, community=self.music, position=0)
+        Request.objects.create(user=self.bob, community=self.art)
+        Invitation.objects.create(community=self.film, invitor=ann, invitee=self.bob)
+
+    def request_batch(self, community_ids):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.post('/api/membership/request/batch/', {'community': community_ids}, format='json')
+        self.client.logout()
+
+        return response
+
+    def test_request_batch(self):
+        ids = [self.chess.id, self.tournament.id, self.practice.id, self.music.id, self.art.id, self.film.id,
+               self.closed.id, 0, self.chess.id]
+        response = self.request_batch(ids)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        results = {i['community']: i for i in response.data['results']}
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(results[self.chess.id]['request']['status'], 'W')
+        self.assertEqual(results[self.tournament.id]['request']['status'], 'A')
+        self.assertEqual(results[self.practice.id]['error']['code'], 'outside_participator_disallowed')
+        self.assertEqual(results[self.music.id]['error']['code'], 'member_already_exists')
+        self.assertEqual(results[self.art.id]['error']['code'], 'request_already_exists')
+        self.assertEqual(results[self.film.id]['error']['code'], 'invitation_already_exists')
+        self.assertEqual(results[self.closed.id]['error']['code'], 'community_not_accepting_requests')
+        self.assertEqual(results[0]['error']['code'], 'does_not_exist')
+
+        self.assertEqual(Request.objects.filter(user=self.bob, community=self.chess, status='W').count(), 1)
+        request = Request.objects.get(user=self.bob, community=self.chess, status='W')
+        self.assertEqual(results[self.chess.id]['request']['id'], request.id)
+        self.assertTrue(Membership.objects.filter(user=self.bob, community=self.tournament, position=0).exists())
+
+    def test_request_batch_base_staff(self):
+        Membership.objects.create(user=self.bob, community=self.chess, position=1)
+        response = self.request_batch([self.practice.id])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['results'][0]['request']['status'], 'A')
+
+    def test_request_batch_queries(self):
+        ids = [self.chess.id, self.tournament.id, self.practice.id, self.music.id, self.art.id, self.film.id]
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        # Session, user, communities, community events, memberships, requests, invitations, active positions,
+        # then the savepoint, requests and memberships inserts and its release, the version of the user and the created
+        # requests
+        with self.assertNumQueries(14):
+            self.client.post('/api/membership/request/batch/', {'community': ids}, format='json')
+
+    def test_request_batch_nothing_created(self):
+        response = self.request_batch([self.music.id])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['results'][0]['error']['code'], 'member_already_exists')
+
+        response = self.request_batch([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class InvitationBatchTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.users = [User.objects.create_user(username='user{}'.format(i), password='password303') for i in range(6)]
+
+        schedule = {
+            'location': 'Auditorium', 'start_date': datetime.date(2023, 8, 1), 'end_date': datetime.date(2023, 8, 2),
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(17, 0)
+        }
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_official=True)
+        self.practice = CommunityEvent.objects.create(
+            name_th='ซ้อมหมากรุก', name_en='Chess Practice', created_under=self.chess, **schedule
+        )
+
+        Membership.objects.create(user=self.bob, community=self.chess, position=3)
+        Membership.objects.create(user=self.bob, community=self.practice, position=3)
+        for user in self.users[:4]:
+            Membership.objects.create(user=user, community=self.chess, position=0)
+
+        Membership.objects.create(user=self.users[1], community=self.practice, position=0)
+        Invitation.objects.create(community=self.practice, invitor=self.bob, invitee=self.users[2])
+        Request.objects.create(user=self.users[3], community=self.practice, status='W')
+
+    def invite_batch(self, data):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.post('/api/membership/invitation/batch/', data, format='json')
+        self.client.logout()
+
+        return response
+
+    def test_invite_batch(self):
+        ids = [i.id for i in self.users] + [0]
+        response = self.invite_batch({'community': self.practice.id, 'invitee': ids})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        results = {i['invitee']: i for i in response.data['results']}
+        self.assertEqual(results[self.users[0].id]['invitation']['invitor'], self.bob.id)
+        self.assertEqual(results[self.users[1].id]['error']['code'], 'member_already_exists')
+        self.assertEqual(results[self.users[2].id]['error']['code'], 'invitation_already_exists')
+        self.assertEqual(results[self.users[3].id]['error']['code'], 'request_already_exists')
+        self.assertEqual(results[self.users[4].id]['error']['code'], 'outside_participator_disallowed')
+        self.assertEqual(results[0]['error']['code'], 'does_not_exist')
+
+        self.assertEqual(Invitation.objects.filter(community=self.practice, status='W').count(), 2)
+        invitation = Invitation.objects.get(community=self.practice, invitee=self.users[0])
+        self.assertEqual(results[self.users[0].id]['invitation']['id'], invitation.id)
+
+    def test_invite_batch_from_community(self):
+        response = self.invite_batch({'community': self.practice.id, 'from_community': self.chess.id})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = {i['invitee'] for i in response.data['results'] if 'invitation' in i}
+        self.assertEqual(created, {self.users[0].id})
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_invite_batch_queries(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        # Session, user, community, active positions, community event, invitees, base memberships, memberships,
+        # invitations, requests, then the savepoint, the invitations insert and its release, and the created invitations
+        with self.assertNumQueries(14):
+            self.client.post(
+                '/api/membership/invitation/batch/', {'community': self.practice.id, 'from_community': self.chess.id},
+                format='json'
+            )
+
+    def test_invite_batch_not_staff(self):
+        Membership.objects.filter(user=self.bob, community=self.practice).update(position=0)
+        response = self.invite_batch({'community': self.practice.id, 'invitee': [self.users[0].id]})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Invitation.objects.filter(invitee=self.users[0]).exists())
+
+
+class MembershipTransitionTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.joe = User.objects.create_user(username='joe', password='password303')
+        self.ann = User.objects.create_user(username='ann', password='password303')
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+        self.music = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club')
+        self.bob_chess = Membership.objects.create(user=self.bob, community=self.chess, position=3)
+        self.bob_music = Membership.objects.create(user=self.bob, community=self.music, position=2)
+        self.joe_chess = Membership.objects.create(user=self.joe, community=self.chess, position=0)
+        self.joe_music = Membership.objects.create(user=self.joe, community=self.music, position=0)
+        self.ann_music = Membership.objects.create(user=self.ann, community=self.music, position=1)
+
+    def patch(self, path, data):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.patch(path, data, format='json')
+        self.client.logout()
+
+        return response
+
+    def test_leadership_handover(self):
+        response = self.patch('/api/membership/membership/{}/'.format(self.joe_chess.id), {'position': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['position'], 3)
+        self.bob_chess.refresh_from_db()
+        self.assertEqual(self.bob_chess.position, 2)
+        self.assertEqual(self.bob_chess.updated_by, self.bob)
+
+    def test_own_transitions(self):
+        response = self.patch('/api/membership/membership/{}/'.format(self.bob_music.id), {'position': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.patch('/api/membership/membership/{}/'.format(self.bob_music.id), {'status': 'R'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'R')
+
+    def test_batch(self):
+        response = self.patch('/api/membership/membership/batch/', {'memberships': [
+            {'id': self.joe_chess.id, 'position': 1},
+            {'id': self.joe_music.id, 'status': 'X'},
+            {'id': self.ann_music.id, 'position': 0},
+        ]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(i['position'], i['status']) for i in response.data], [(1, 'A'), (0, 'X'), (0, 'A')])
+
+    def test_batch_rejected(self):
+        response = self.patch('/api/membership/membership/batch/', {'memberships': [
+            {'id': self.joe_chess.id, 'position': 1},
+            {'id': self.ann_music.id, 'position': 2},
+            {'id': 0, 'status': 'R'},
+        ]})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = {i['id']: i['code'] for i in response.data['errors']}
+        self.assertEqual(errors, {self.ann_music.id: 'membership_error', 0: 'does_not_exist'})
+
+        # Nothing is applied if any change is rejected
+        self.joe_chess.refresh_from_db()
+        self.assertEqual(self.joe_chess.position, 0)
+
+    def test_batch_queries(self):
+        memberships = [{'id': self.joe_chess.id, 'position': 1}, {'id': self.joe_music.id, 'status': 'X'}]
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        # Session, user, then the savepoint, memberships, leaders and own memberships, one update per target (two), the
+        # versions of their users and the release of the savepoint
+        with self.assertNumQueries(9):
+            self.client.patch('/api/membership/membership/batch/', {'memberships': memberships}, format='json')
+
+    def test_transition_memberships_command(self):
+        call_command('transition_memberships', self.chess.id, self.music.id, status='R', stdout=io.StringIO())
+
+        self.assertEqual(Membership.objects.filter(status='R').count(), 5)
+        self.assertEqual(Membership.objects.get(pk=self.bob_chess.id).position, 3)
+
+
+class MembershipConstraintTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.joe = User.objects.create_user(username='joe', password='password303')
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+        Membership.objects.create(user=self.bob, community=self.chess, position=1)
+
+    def test_unique_pending_request(self):
+        Request.objects.create(user=self.joe, community=self.chess)
+        Request.objects.create(user=self.joe, community=self.chess, status='D')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Request.objects.create(user=self.joe, community=self.chess)
+
+    def test_unique_current_membership(self):
+        Membership.objects.create(user=self.joe, community=self.chess, status='L')
+        Membership.objects.create(user=self.joe, community=self.chess, status='R')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Membership.objects.create(user=self.joe, community=self.chess)
+
+    def test_accept_request_conflict(self):
+        # Joe accepted an invitation while his request was pending
+        joe_request = Request.objects.create(user=self.joe, community=self.chess)
+        Membership.objects.create(user=self.joe, community=self.chess)
+
+        self.client.login(username=BOB['username'], password=BOB['password'])
+        response = self.client.patch('/api/membership/request/{}/'.format(joe_request.id), {'status': 'A'})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        joe_request.refresh_from_db()
+        self.assertEqual(joe_request.status, 'W')
+
+    def test_other_integrity_errors(self):
+        Request.objects.create(user=self.joe, community=self.chess)
+        errors = list()
+
+        for create in (
+            lambda: Request.objects.create(user=self.joe, community=self.chess),
+            lambda: Request.objects.create(community=self.chess),
+        ):
+            try:
+                with transaction.atomic():
+                    create()
+            except IntegrityError as exc:
+                errors.append(exc)
+
+        # Only violations of the partial unique constraints are conflicts, a missing user is a server error
+        self.assertEqual([is_conflict(i) for i in errors], [True, False])
+
+    def test_explain_index_usage(self):
+        if connection.vendor == 'postgresql':
+            # The tables of the test are too small for the planner to prefer an index otherwise
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+        user_id, community_id = self.joe.id, self.chess.id
+        queries = [
+            # core.roles and membership.inbox
+            ('membership_user_idx', Membership.objects.filter(user_id=user_id, status='A')),
+            ('membership_user_idx', Membership.objects.filter(
+                user_id=user_id, community_id=community_id, status='A', position__in=(1, 2, 3)
+            )),
+            # membership.bulk checks of many invitees, and members of a community
+            ('membership_user_idx', Membership.objects.filter(
+                community_id=community_id, status__in=('A', 'R'), user_id__in=(1, 2)
+            )),
+            ('membership_community_idx', Membership.objects.filter(community_id=community_id, status='A')),
+            ('request_community_idx', Request.objects.filter(
+                community_id=community_id, status='W', user_id__in=(1, 2)
+            )),
+            ('invitation_community_idx', Invitation.objects.filter(
+                community_id=community_id, status='W', invitee_id__in=(1, 2)
+            )),
+        ]
+
+        # SQLite only uses partial indexes for literal values, queries of Django are parameterized
+        if connection.vendor == 'postgresql':
+            queries += [
+                ('unique_pending_request', Request.objects.filter(
+                    user_id=user_id, community_id__in=(community_id,), status='W'
+                )),
+                ('unique_pending_invitation', Invitation.objects.filter(
+                    invitee_id=user_id, community_id__in=(community_id,), status='W'
+                )),
+            ]
+
+        for index, queryset in queries:
+            self.assertIn(index, queryset.explain())
+
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'], name='Bob')
+        self.joe = User.objects.create_user(username='joe', password='password303')
+        self.ann = User.objects.create_user(username='ann', password='password303')
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club', is_publicly_visible=True)
+        self.music = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club', is_publicly_visible=False)
+        self.bob_membership = Membership.objects.create(user=self.bob, community=self.chess, position=3)
+        self.joe_membership = Membership.objects.create(user=self.joe, community=self.chess, status='L')
+        Membership.objects.create(user=self.ann, community=self.music, position=3)
+
+        self.joe_request = Request.objects.create(user=self.joe, community=self.chess)
+        Request.objects.create(user=self.joe, community=self.music)
+        self.invitation = Invitation.objects.create(community=self.chess, invitor=self.bob, invitee=self.ann)
+
+    def get_export(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        return b''.join(response.streaming_content).decode(), response
+
+    def test_ndjson(self):
+        content, response = self.get_export('/api/membership/membership/export/', community=self.chess.id)
+        rows = [json.loads(i) for i in content.splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual([i['id'] for i in rows], [self.bob_membership.id, self.joe_membership.id])
+        self.assertEqual(rows[0]['user_username'], BOB['username'])
+        self.assertEqual(rows[0]['user_name'], 'Bob')
+        self.assertEqual(rows[0]['community_name_en'], 'Chess Club')
+        self.assertEqual(rows[0]['position'], 3)
+
+    def test_csv(self):
+        content, response = self.get_export('/api/membership/membership/export/', type='csv', status='A')
+        rows = list(csv.reader(io.StringIO(content)))
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="memberships.csv"')
+        self.assertEqual(rows[0][:4], ['id', 'user', 'user_username', 'user_name'])
+        # Anonymous users only see the memberships of publicly visible communities, as in the list
+        self.assertEqual([int(i[0]) for i in rows[1:]], [self.bob_membership.id])
+
+    def test_requests_and_invitations(self):
+        self.client.login(username=BOB['username'], password=BOB['password'])
+
+        content, _ = self.get_export('/api/membership/request/export/')
+        self.assertEqual([json.loads(i)['id'] for i in content.splitlines()], [self.joe_request.id])
+
+        content, _ = self.get_export('/api/membership/invitation/export/', type='csv', invitee=self.ann.id)
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual([int(i[0]) for i in rows[1:]], [self.invitation.id])
+
+    def test_invalid(self):
+        response = self.client.get('/api/membership/membership/export/', {'type': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get('/api/membership/membership/export/', {'position': 'leader'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get('/api/membership/request/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,188 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from core.roles import DEPUTY_LEADER
+from membership.models import Membership
+from user.claims import bump_user_versions
+
+
+# Updates of membership positions and statuses are transitions of a kind, each kind being checked against its rules
+# in order. Transitions are validated and applied for many memberships at once, under row locks and in one
+# transaction, either all of them or none.
+
+OWN_STATUS_TRANSITIONS = (('A', 'R'), ('R', 'A'), ('A', 'L'), ('R', 'L'))
+REMOVAL_STATUS_TRANSITIONS = (('A', 'X'), ('R', 'X'))
+
+# own is the active position of the user applying the transition in the community of the membership, None for
+# administrative transitions (e.g. management commands) which are not made on behalf of a member.
+Transition = namedtuple('Transition', ('membership', 'position', 'status', 'own', 'is_owner'))
+
+
+def get_kind(transition):
+    membership = transition.membership
+
+    if transition.own is None:
+        return 'administrative'
+    elif membership.position == 3 or not (transition.is_owner or transition.own in DEPUTY_LEADER):
+        return 'forbidden'
+    elif transition.is_owner:
+        return 'own'
+    elif membership.position == transition.position and membership.status != transition.status:
+        return 'removal'
+    elif membership.position != transition.position and membership.status == transition.status:
+        return 'assignment'
+    elif membership.position != transition.position and membership.status != transition.status:
+        return 'both'
+    return None
+
+
+RULES = {
+    # Leader memberships are not able to be updated by anyone, others only by their owner or a deputy leader
+    'forbidden': (
+        (lambda t: True, _('You do not have permission to perform this action.')),
+    ),
+    # Leaving and Retiring
+    'own': (
+        (
+            lambda t: t.membership.position != t.position,
+            _('Membership owners are not able to change their own position.')
+        ),
+        (
+            lambda t: t.membership.status != t.status and (t.membership.status, t.status) not in OWN_STATUS_TRANSITIONS,
+            _('Membership owners are only able to switch their own membership status from active and retired to ' +
+              'left, or between active and retired.')
+        ),
+    ),
+    # Member Removal
+    'removal': (
+        (
+            lambda t: (t.membership.status, t.status) not in REMOVAL_STATUS_TRANSITIONS,
+            _('Membership statuses are only meant to be updated from active or retired to removed if attempted by ' +
+              'other members in the community.')
+        ),
+        (
+            lambda t: t.own <= t.position,
+            _('Membership statuses can only be set to removed on memberships with a lower position by the leader or ' +
+              'the deputy leader of the community.')
+        ),
+    ),
+    # Position Assignation
+    'assignment': (
+        (
+            lambda t: t.own == 2 and t.membership.position in DEPUTY_LEADER,
+            _('Membership positions are not able to be updated if the position is already equal to or higher than ' +
+              'your position.')
+        ),
+        (
+            lambda t: t.own == 2 and t.position in DEPUTY_LEADER,
+            _('Membership positions are not able to be updated to the position equal to or higher than your own ' +
+              'position.')
+        ),
+    ),
+    'both': (
+        (lambda t: True, _('Memberships are not able to be updated both position and status at the same time.')),
+    ),
+    'administrative': (
+        (
+            lambda t: t.membership.status != t.status and
+            (t.membership.status, t.status) not in OWN_STATUS_TRANSITIONS + REMOVAL_STATUS_TRANSITIONS,
+            _('Membership statuses are only able to be updated from active or retired to left or removed, or between ' +
+              'active and retired.')
+        ),
+    ),
+}
+
+
+def get_transition_error(transition):
+    if transition.position not in (0, 1, 2, 3):
+        return _('Position must be a number from 0 to 3.')
+
+    for rule, message in RULES.get(get_kind(transition), ()):
+        if rule(transition):
+            return message
+    return None
+
+
+def apply_transitions(changes, user=None):
+    # Applies {membership_id: (position, status)} on behalf of the user, or administratively without a user, positions
+    # or statuses of None are left unchanged. Returns the updated memberships and {membership_id: (message, code)} of
+    # the rejected changes, nothing is updated if any change is rejected. A membership promoted to leader demotes the
+    # active leader of its community to deputy leader.
+    with transaction.atomic():
+        memberships = Membership.objects.select_for_update().filter(pk__in=list(changes)).order_by('pk')
+        memberships = {i.id: i for i in memberships}
+        community_ids = {i.community_id for i in memberships.values()}
+
+        # Leaders and own memberships of the affected communities are locked too, they may be demoted or checked
+        conditions = Q(position=3)
+        if user is not None:
+            conditions |= Q(user_id=user.id)
+        related = Membership.objects.select_for_update().filter(conditions, community_id__in=community_ids, status='A')
+        related = list(related.order_by('pk'))
+        own_positions = {i.community_id: i.position for i in related if user is not None and i.user_id == user.id}
+
+        errors = dict()
+        targets = dict()
+        promoted_communities = set()
+
+        for membership_id, (position, status) in changes.items():
+            if membership_id not in memberships:
+                errors[membership_id] = (_('Membership does not exist.'), 'does_not_exist')
+                continue
+
+            membership = memberships[membership_id]
+            position = membership.position if position is None else position
+            status = membership.status if status is None else status
+            targets[membership_id] = (position, status)
+            transition = Transition(
+                membership, position, status, None if user is None else own_positions.get(membership.community_id, 0),
+                user is not None and membership.user_id == user.id
+            )
+            message = get_transition_error(transition)
+
+            if message is None and position == 3 and membership.position != 3:
+                if membership.community_id in promoted_communities:
+                    message = _('Only one membership of a community is able to be promoted to leader.')
+                promoted_communities.add(membership.community_id)
+
+            if message is not None:
+                errors[membership_id] = (message, 'membership_error')
+
+        if len(errors) > 0:
+            return list(), errors
+
+        updated_at = timezone.now()
+        updated_by_id = None if user is None else user.id
+
+        demoted_ids = [
+            i.id for i in related if i.position == 3 and i.community_id in promoted_communities and i.id not in changes
+        ]
+        if len(demoted_ids) > 0:
+            Membership.objects.filter(pk__in=demoted_ids).update(
+                position=2, updated_by_id=updated_by_id, updated_at=updated_at
+            )
+
+        # One update per distinct target, e.g. a single one to retire every member of many communities
+        updates = dict()
+        for membership_id, target in targets.items():
+            membership = memberships[membership_id]
+            if (membership.position, membership.status) != target:
+                updates.setdefault(target, list()).append(membership_id)
+                membership.position, membership.status = target
+                membership.updated_by_id, membership.updated_at = updated_by_id, updated_at
+
+        for (position, status), ids in updates.items():
+            Membership.objects.filter(pk__in=ids).update(
+                position=position, status=status, updated_by_id=updated_by_id, updated_at=updated_at
+            )
+
+        # Updates do not send signals, the versions of the affected users are bumped here
+        bump_user_versions([i.user_id for i in related if i.id in demoted_ids] + [
+            memberships[i].user_id for ids in updates.values() for i in ids
+        ])
+
+    return [memberships[i] for i in changes], dict()
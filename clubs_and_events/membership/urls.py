@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from membership.views import RequestViewSet, InvitationViewSet, MembershipViewSet, CustomMembershipLabelViewSet
-from membership.views import AdvisoryViewSet
+from membership.views import AdvisoryViewSet, InboxAPIView
 
 
 router = DefaultRouter()
@@ -13,5 +13,6 @@ router.register('membership', MembershipViewSet)
 router.register('advisory', AdvisoryViewSet)
 
 urlpatterns = [
+    path('inbox/', InboxAPIView.as_view()),
     path('', include(router.urls))
 ]
\ No newline at end of file
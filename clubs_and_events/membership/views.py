@@ -1,9 +1,17 @@
-from rest_framework import permissions, status, viewsets
+from django.db import transaction
+from rest_framework import permissions, serializers, status, views, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
-
-from community.models import CommunityEvent, Community
-from core.permissions import IsStaffOfCommunity, IsInPubliclyVisibleCommunity, IsDeputyLeaderOfCommunity
-from core.utils import filter_queryset
+from rest_framework.settings import api_settings
+
+from community.models import Community
+from core.conditional import ConditionalGetMixin
+from core.export import ExportMixin
+from core.filters import FilterSpec, QueryFilter, QueryFilterBackend, VisibilityFilterBackend
+from core.permissions import IsStaffOfCommunity, IsDeputyLeaderOfCommunity
+from core.roles import MEMBER, STAFF, has_active_position
+from membership.bulk import get_invitation_errors, get_request_errors
+from membership.inbox import get_inbox, get_visible_invitations, get_visible_requests
 from membership.models import Request, Membership, Invitation, CustomMembershipLabel, Advisory
 from membership.permissions import IsRequestOwner, IsEditableRequest, IsCancellableRequest, IsAbleToViewRequestList
 from membership.permissions import IsApplicableForCustomMembershipLabel
@@ -11,13 +19,26 @@ from membership.permissions import IsInvitationInvitee, IsInvitationInvitor, IsA
 from membership.permissions import IsAbleToUpdateMembership
 from membership.serializers import ExistingRequestSerializer, NotExistingRequestSerializer
 from membership.serializers import ExistingInvitationSerializer, NotExistingInvitationSerializer
-from membership.serializers import MembershipSerializer, AdvisorySerializer
+from membership.serializers import MembershipSerializer, MembershipBatchItemSerializer, AdvisorySerializer
 from membership.serializers import NotExistingCustomMembershipLabelSerializer, ExistingCustomMembershipLabelSerializer
+from membership.transitions import apply_transitions
+from user.claims import bump_user_version
+from user.models import User
 
 
-class RequestViewSet(viewsets.ModelViewSet):
+class RequestViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Request.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+    filter_backends = (QueryFilterBackend,)
+    filter_spec = FilterSpec(
+        user=QueryFilter(int, is_foreign_key=True),
+        community=QueryFilter(int, is_foreign_key=True),
+        status=QueryFilter(choices=Request.STATUS),
+    )
+    max_batch_size = 50
+    export_fields = ('id', 'user', 'user__username', 'user__name', 'community', 'community__name_en', 'status',
+                     'created_at', 'updated_at', 'updated_by')
+    export_name = 'requests'
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -35,49 +56,110 @@ class RequestViewSet(viewsets.ModelViewSet):
             return NotExistingRequestSerializer
         return ExistingRequestSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        memberships = Membership.objects.filter(user_id=request.user.id, status='A')
-        communities = [i.community.id for i in memberships]
-
-        id_set = [i.id for i in queryset.filter(community_id__in=communities)]
-        id_set += [i.id for i in queryset.filter(user_id=request.user.id)]
+    def get_list_queryset(self):
+        return self.filter_queryset(get_visible_requests(self.request.user.id))
 
-        queryset = queryset.filter(pk__in=id_set)
-
-        queryset = filter_queryset(queryset, request, target_param='user', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='community', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='status', is_foreign_key=False)
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
-        obj = serializer.save(user=request.user, updated_by=request.user)
 
-        community_event = CommunityEvent.objects.filter(pk=obj.community.id)
-        if len(community_event) == 1:
-            request_obj = Request.objects.get(pk=obj.id)
-            request_obj.status = 'A'
-            request_obj.save()
-            Membership.objects.create(user_id=obj.user.id, position=0, community_id=obj.community.id,
-                                      created_by_id=request.user.id, updated_by_id=request.user.id)
+        with transaction.atomic():
+            obj = serializer.save(user=request.user, updated_by=request.user)
+
+            if obj.community.is_community_event:
+                obj.status = 'A'
+                obj.save()
+                Membership.objects.create(user_id=obj.user.id, position=0, community_id=obj.community.id,
+                                          created_by_id=request.user.id, updated_by_id=request.user.id)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        ids = request.data.getlist('community') if hasattr(request.data, 'getlist') else request.data.get('community')
+        if not isinstance(ids, list) or not 0 < len(ids) <= self.max_batch_size:
+            return Response(
+                {'community': ['Between 1 and {} communities must be requested at once.'.format(self.max_batch_size)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'community': ['Communities must be given by their ids.']}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        communities = Community.objects.in_bulk(ids)
+        errors = get_request_errors(request, list(communities.values()))
+
+        results = list()
+        requests = list()
+        memberships = list()
+
+        for community_id in ids:
+            if community_id not in communities:
+                message, code = 'Invalid pk "{}" - object does not exist.'.format(community_id), 'does_not_exist'
+                results.append({'community': community_id, 'error': {'message': message, 'code': code}})
+            elif community_id in errors:
+                message, code = errors[community_id]
+                results.append({'community': community_id, 'error': {'message': message, 'code': code}})
+            else:
+                # Requests to community events are accepted right away
+                is_community_event = communities[community_id].is_community_event
+                requests.append(Request(
+                    user=request.user, community_id=community_id, status='A' if is_community_event else 'W',
+                    updated_by=request.user
+                ))
+                if is_community_event:
+                    memberships.append(Membership(
+                        user_id=request.user.id, position=0, community_id=community_id,
+                        created_by_id=request.user.id, updated_by_id=request.user.id
+                    ))
+                results.append({'community': community_id, 'request': requests[-1]})
+
+        if len(requests) == 0:
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            Request.objects.bulk_create(requests)
+            Membership.objects.bulk_create(memberships)
+
+        if len(memberships) > 0:
+            bump_user_version(request.user.id)
+
+        # Primary keys are not set on bulk created objects on every backend, the requests are read back
+        created = Request.objects.filter(
+            user=request.user, community_id__in=[i.community_id for i in requests], status__in=('W', 'A')
+        ).order_by('pk')
+        created = {i.community_id: i for i in created}
+
+        for result in results:
+            if 'request' in result:
+                result['request'] = ExistingRequestSerializer(created[result['community']]).data
+
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(self.get_object(), data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
-        obj = serializer.save(updated_by=request.user)
 
-        if obj.status == 'A':
-            Membership.objects.create(user_id=obj.user.id, position=0, community_id=obj.community.id,
-                                      created_by_id=request.user.id, updated_by_id=request.user.id)
-        elif obj.status == 'W':
+        with transaction.atomic():
+            obj = serializer.save(updated_by=request.user)
+
+            if obj.status == 'A':
+                Membership.objects.create(user_id=obj.user.id, position=0, community_id=obj.community.id,
+                                          created_by_id=request.user.id, updated_by_id=request.user.id)
+
+        if obj.status == 'W':
             return Response(
                 {'error': 'Request statuses are not able to be updated to waiting.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -86,9 +168,20 @@ class RequestViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class InvitationViewSet(viewsets.ModelViewSet):
+class InvitationViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Invitation.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+    filter_backends = (QueryFilterBackend,)
+    filter_spec = FilterSpec(
+        invitor=QueryFilter(int, is_foreign_key=True),
+        invitee=QueryFilter(int, is_foreign_key=True),
+        community=QueryFilter(int, is_foreign_key=True),
+        status=QueryFilter(choices=Invitation.STATUS),
+    )
+    max_batch_size = 500
+    export_fields = ('id', 'community', 'community__name_en', 'invitor', 'invitee', 'invitee__username',
+                     'invitee__name', 'status', 'created_at', 'updated_at')
+    export_name = 'invitations'
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -107,26 +200,16 @@ class InvitationViewSet(viewsets.ModelViewSet):
             return NotExistingInvitationSerializer
         return ExistingInvitationSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        memberships = Membership.objects.filter(user_id=request.user.id, status='A')
-        communities = [i.community.id for i in memberships]
+    def get_list_queryset(self):
+        return self.filter_queryset(get_visible_invitations(self.request.user.id))
 
-        id_set = [i.id for i in queryset.filter(community_id__in=communities)]
-        id_set += [i.id for i in queryset.filter(invitor_id=request.user.id)]
-        id_set += [i.id for i in queryset.filter(invitee_id=request.user.id)]
-
-        queryset = queryset.filter(pk__in=id_set)
-
-        queryset = filter_queryset(queryset, request, target_param='invitor', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='invitee', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='community', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='status', is_foreign_key=False)
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
@@ -135,15 +218,97 @@ class InvitationViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        # Invites either the listed users or every active member of from_community at once
+        try:
+            community = Community.objects.get(pk=int(request.data.get('community')))
+        except (TypeError, ValueError, Community.DoesNotExist):
+            return Response({'community': ['Invalid community.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not has_active_position(request, community.id, STAFF):
+            return Response(
+                {'detail': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        results = list()
+
+        if request.data.get('from_community') is not None:
+            try:
+                from_community_id = int(request.data.get('from_community'))
+            except (TypeError, ValueError):
+                return Response({'from_community': ['Invalid community.']}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not has_active_position(request, from_community_id, MEMBER):
+                return Response(
+                    {'detail': 'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN
+                )
+
+            # Kept as a subquery in the validation queries, a parent community may have thousands of members
+            invitee_ids = Membership.objects.filter(community_id=from_community_id, status='A').exclude(
+                user_id=request.user.id
+            ).values_list('user_id', flat=True)
+        else:
+            ids = request.data.getlist('invitee') if hasattr(request.data, 'getlist') else request.data.get('invitee')
+            if not isinstance(ids, list) or not 0 < len(ids) <= self.max_batch_size:
+                return Response(
+                    {'invitee': ['Between 1 and {} users must be invited at once.'.format(self.max_batch_size)]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                ids = list(dict.fromkeys(int(i) for i in ids))
+            except (TypeError, ValueError):
+                return Response({'invitee': ['Users must be given by their ids.']}, status=status.HTTP_400_BAD_REQUEST)
+
+            invitee_ids = set(User.objects.filter(pk__in=ids).values_list('id', flat=True))
+            for invitee_id in ids:
+                if invitee_id not in invitee_ids:
+                    message, code = 'Invalid pk "{}" - object does not exist.'.format(invitee_id), 'does_not_exist'
+                    results.append({'invitee': invitee_id, 'error': {'message': message, 'code': code}})
+            invitee_ids = [i for i in ids if i in invitee_ids]
+
+        errors = get_invitation_errors(request, community, invitee_ids)
+        invitations = list()
+
+        for invitee_id in invitee_ids:
+            if invitee_id in errors:
+                message, code = errors[invitee_id]
+                results.append({'invitee': invitee_id, 'error': {'message': message, 'code': code}})
+            else:
+                invitations.append(Invitation(community=community, invitor=request.user, invitee_id=invitee_id))
+                results.append({'invitee': invitee_id, 'invitation': invitations[-1]})
+
+        if len(invitations) == 0:
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            Invitation.objects.bulk_create(invitations, batch_size=1000)
+
+        # Primary keys are not set on bulk created objects on every backend, the invitations are read back
+        created = Invitation.objects.filter(
+            community=community, invitee_id__in=[i.invitee_id for i in invitations], status='W'
+        ).order_by('pk')
+        created = {i.invitee_id: i for i in created}
+
+        for result in results:
+            if 'invitation' in result:
+                result['invitation'] = ExistingInvitationSerializer(created[result['invitee']]).data
+
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(self.get_object(), data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
-        obj = serializer.save()
 
-        if obj.status == 'A':
-            Membership.objects.create(user_id=obj.invitee.id, position=0, community_id=obj.community.id,
-                                      created_by_id=request.user.id, updated_by_id=request.user.id)
-        elif obj.status == 'W':
+        with transaction.atomic():
+            obj = serializer.save()
+
+            if obj.status == 'A':
+                Membership.objects.create(user_id=obj.invitee.id, position=0, community_id=obj.community.id,
+                                          created_by_id=request.user.id, updated_by_id=request.user.id)
+
+        if obj.status == 'W':
             return Response(
                 {'error': 'Invitation statuses are not able to be updated to waiting.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -152,62 +317,76 @@ class InvitationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class MembershipViewSet(viewsets.ModelViewSet):
+class MembershipViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Membership.objects.all()
     serializer_class = MembershipSerializer
     http_method_names = ('get', 'put', 'patch', 'head', 'options')
+    filter_backends = (VisibilityFilterBackend, QueryFilterBackend)
+    visibility_field = 'community'
+    filter_spec = FilterSpec(
+        user=QueryFilter(int, is_foreign_key=True),
+        community=QueryFilter(int, is_foreign_key=True),
+        position=QueryFilter(int, lookups=('exact', 'in', 'gte', 'lte'), choices=Membership.POSITIONS),
+        status=QueryFilter(choices=Membership.STATUS),
+    )
+    max_batch_size = 1000
+    export_fields = ('id', 'user', 'user__username', 'user__name', 'community', 'community__name_en', 'position',
+                     'status', 'created_at', 'updated_at', 'created_by', 'updated_by')
+    export_name = 'memberships'
 
     def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        elif self.request.method in ('PUT', 'PATCH'):
+        if self.request.method in ('PUT', 'PATCH'):
             return (permissions.IsAuthenticated(), IsAbleToUpdateMembership())
         return tuple()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = [i.id for i in Community.objects.filter(is_publicly_visible=True)]
-            queryset = queryset.filter(community_id__in=visible_ids)
-
-        queryset = filter_queryset(queryset, request, target_param='user', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='community', is_foreign_key=True)
-        queryset = filter_queryset(queryset, request, target_param='position', is_foreign_key=False)
-        queryset = filter_queryset(queryset, request, target_param='status', is_foreign_key=False)
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
     def update(self, request, *args, **kwargs):
-        old_position = Membership.objects.get(pk=kwargs['pk']).position
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
 
-        serializer = self.get_serializer(self.get_object(), data=request.data, many=False)
+        change = (
+            serializer.validated_data.get('position', instance.position),
+            serializer.validated_data.get('status', instance.status)
+        )
+        memberships, errors = apply_transitions({instance.id: change}, request.user)
+        if len(errors) > 0:
+            message, code = errors[instance.id]
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code=code)
+
+        return Response(self.get_serializer(memberships[0]).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['patch'])
+    def batch(self, request, *args, **kwargs):
+        # Applies [{'id', 'position', 'status'}] all at once or not at all, omitted fields are left unchanged
+        items = request.data.get('memberships') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not 0 < len(items) <= self.max_batch_size:
+            return Response(
+                {'memberships': ['Between 1 and {} memberships must be updated at once.'.format(self.max_batch_size)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = MembershipBatchItemSerializer(data=items, many=True)
         serializer.is_valid(raise_exception=True)
-        obj = serializer.save(updated_by=request.user)
 
-        # If the membership position is updated to 3, demote own position to 2.
-        if old_position != obj.position and obj.position == 3:
-            membership = Membership.objects.get(
-                user_id=request.user.id,
-                community_id=Membership.objects.get(pk=kwargs['pk']).community.id
+        changes = {i['id']: (i.get('position'), i.get('status')) for i in serializer.validated_data}
+        memberships, errors = apply_transitions(changes, request.user)
+        if len(errors) > 0:
+            return Response(
+                {'errors': [{'id': i, 'message': message, 'code': code} for i, (message, code) in errors.items()]},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            membership.position = 2
-            membership.updated_by = request.user
-            membership.save()
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(self.get_serializer(memberships, many=True).data, status=status.HTTP_200_OK)
 
 
-class CustomMembershipLabelViewSet(viewsets.ModelViewSet):
+class CustomMembershipLabelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = CustomMembershipLabel.objects.all()
     http_method_names = ('get', 'post', 'put', 'patch', 'delete', 'head', 'options')
+    filter_backends = (VisibilityFilterBackend,)
+    visibility_field = 'membership__community'
 
     def get_permissions(self):
-        if self.request.method == 'GET':
-            return (IsInPubliclyVisibleCommunity(),)
-        elif self.request.method == 'POST':
+        if self.request.method == 'POST':
             # Includes IsDeputyLeaderOfCommunity() in validation ()of the serializer
             # Includes IsApplicableForCustomMembershipLabel() in validation ()of the serializer
             return (permissions.IsAuthenticated(),)
@@ -222,18 +401,6 @@ class CustomMembershipLabelViewSet(viewsets.ModelViewSet):
             return NotExistingCustomMembershipLabelSerializer
         return ExistingCustomMembershipLabelSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        if not self.request.user.is_authenticated:
-            visible_ids = [i.id for i in Community.objects.filter(is_publicly_visible=True)]
-            visible_ids = [i.id for i in Membership.objects.filter(community_id__in=visible_ids)]
-            queryset = queryset.filter(membership_id__in=visible_ids)
-
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(serializer.data)
-
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, many=False)
         serializer.is_valid(raise_exception=True)
@@ -249,8 +416,36 @@ class CustomMembershipLabelViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class AdvisoryViewSet(viewsets.ModelViewSet):
+class AdvisoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Advisory.objects.all()
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = AdvisorySerializer
-    http_method_names = ('get', 'head', 'options')
\ No newline at end of file
+    http_method_names = ('get', 'head', 'options')
+
+
+class InboxAPIView(views.APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        inbox, counts = get_inbox(request.user.id)
+        context = {'request': request}
+
+        return Response({
+            'sent': {
+                'requests': ExistingRequestSerializer(inbox['sent']['requests'], many=True, context=context).data,
+                'invitations': ExistingInvitationSerializer(
+                    inbox['sent']['invitations'], many=True, context=context
+                ).data,
+            },
+            'received': {
+                'invitations': ExistingInvitationSerializer(
+                    inbox['received']['invitations'], many=True, context=context
+                ).data,
+            },
+            'to_moderate': {
+                'requests': ExistingRequestSerializer(
+                    inbox['to_moderate']['requests'], many=True, context=context
+                ).data,
+            },
+            'pending_counts': [{'community': i, **j} for i, j in counts.items()],
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from membership.models import Membership
+from user.claims import AccessClaims, get_user_version, load_group_names, load_user_version
+from user.models import User
+
+
+# Access tokens are short lived and signed with an HMAC of the secret key, reads are authenticated without querying the
+# database. Their payload is the user, its group names and active community positions, and the version of the user
+# (User.token_version, see user.claims) when issued. Changes of groups, memberships or of the user bump that version,
+# which rejects every outstanding token of the user.
+
+SALT = 'user.access_tokens'
+
+
+def encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def sign(payload):
+    return encode(salted_hmac(SALT, payload, algorithm='sha256').digest())
+
+
+def issue_access_token(user):
+    # The version is read before the claims, a change in between makes the token stale rather than wrong. It is read
+    # from the database, the mirror in the cache may lag behind a bump made by another worker.
+    version = load_user_version(user.id)
+    expires_at = int(time.time()) + settings.ACCESS_TOKEN_LIFETIME
+
+    # Community ids are grouped by position, [[member of], [staff of], [deputy leader of], [leader of]]
+    roles = [list(), list(), list(), list()]
+    for community_id, position in Membership.objects.filter(user_id=user.id, status='A').values_list(
+            'community_id', 'position'):
+        if position in (0, 1, 2, 3):
+            roles[position].append(community_id)
+
+    payload = encode(json.dumps({
+        'sub': user.id,
+        'usr': user.username,
+        'adm': [int(user.is_staff), int(user.is_superuser)],
+        'ver': version,
+        'grp': sorted(load_group_names(user.id)),
+        'rol': roles,
+        'exp': expires_at,
+    }, separators=(',', ':')).encode())
+
+    return '{}.{}'.format(payload, sign(payload)), expires_at
+
+
+def read_access_token(token):
+    # Returns the payload of a valid token, raises AuthenticationFailed otherwise
+    try:
+        payload, signature = token.split('.')
+    except ValueError:
+        raise exceptions.AuthenticationFailed(_('Invalid access token.'))
+
+    if not constant_time_compare(signature, sign(payload)):
+        raise exceptions.AuthenticationFailed(_('Invalid access token.'))
+
+    try:
+        data = json.loads(decode(payload))
+    except (binascii.Error, ValueError):
+        raise exceptions.AuthenticationFailed(_('Invalid access token.'))
+
+    if data['exp'] <= time.time():
+        raise exceptions.AuthenticationFailed(_('Access token has expired.'))
+
+    if data['ver'] != get_user_version(data['sub']):
+        raise exceptions.AuthenticationFailed(_('Access token is outdated.'))
+
+    return data
+
+
+def refuse_save(*args, **kwargs):
+    raise TypeError('Users rebuilt from the claims of an access token are not saved.')
+
+
+class AccessTokenAuthentication(BaseAuthentication):
+    # Authorization: Bearer <access token>
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid access token header.'))
+
+        try:
+            data = read_access_token(auth[1].decode())
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid access token header.'))
+
+        if request.method in permissions.SAFE_METHODS:
+            # Reads rebuild the user from the claims, it is used as a reference and for its id and staff flags. Its
+            # other fields are blank, it is never saved.
+            user = User(id=data['sub'], username=data['usr'], is_staff=bool(data['adm'][0]),
+                        is_superuser=bool(data['adm'][1]), is_active=True)
+            user._state.adding = False
+            user.save = refuse_save
+        else:
+            # Writes are authorized from the database, with the user itself
+            user = User.objects.filter(pk=data['sub'], is_active=True).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        positions = {i: position for position, community_ids in enumerate(data['rol']) for i in community_ids}
+        claims = AccessClaims(data['sub'], data['ver'], frozenset(data['grp']), positions, data['exp'])
+
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
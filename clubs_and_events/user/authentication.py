@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from user.claims import get_user_version, mirror_user_version
+
+
+# Tokens are resolved to a snapshot of their user kept in the cache, whose least recently used entries are culled
+# first, so authenticated requests do not query the database. Entries are deleted when the token is deleted (revoked)
+# and when its user is saved or deleted, see user.signals. Deleting the entries only reaches the cache of the worker
+# doing it, so every hit is also checked against the version of the user (user.claims), which these changes bump.
+
+def get_token_cache_key(key):
+    # Token keys are credentials, only their digests are used in the cache
+    return 'auth-token:{}'.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def get_token_expiry(created):
+    return created + settings.AUTH_TOKEN_EXPIRY
+
+
+def is_token_expired(created):
+    return get_token_expiry(created) <= timezone.now()
+
+
+def forget_tokens(keys):
+    cache.delete_many([get_token_cache_key(i) for i in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        entry = cache.get(cache_key)
+
+        # Snapshots taken before the token was revoked or the user changed through another worker
+        if entry is not None and entry[1].token_version != get_user_version(entry[1].id):
+            entry = None
+
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            entry = (token.created, token.user)
+            mirror_user_version(token.user.id, token.user.token_version)
+            timeout = (get_token_expiry(token.created) - timezone.now()).total_seconds()
+            if timeout > 0:
+                cache.set(cache_key, entry, timeout=min(timeout, settings.AUTH_TOKEN_CACHE_TIMEOUT))
+
+        created, user = entry
+
+        if is_token_expired(created):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return user, key
@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework import permissions
+
+from core.cache import bump_version, get_version_key
+from user.models import User
+
+
+# Claims of a user (group names) are kept in the shared cache with the version of the user namespace, which is bumped
+# whenever they change. Within a request they are loaded once and kept on the request like core.roles.
+
+# Outstanding tokens are checked against User.token_version, which is bumped along with the user namespace. It is kept
+# in the database so that it survives cache evictions and is shared by every worker, and mirrored in the cache for
+# USER_VERSION_CACHE_TIMEOUT seconds, which bounds how long a worker with its own cache accepts a revoked token.
+
+# Claims carried by a signed access token, see user.access_tokens. Positions are {community_id: position} of the active
+# memberships of the user.
+AccessClaims = namedtuple('AccessClaims', ('user_id', 'version', 'group_names', 'positions', 'expires_at'))
+
+
+def get_user_namespace(user_id):
+    return 'user:{}'.format(user_id)
+
+
+def get_user_version_key(user_id):
+    return 'user-version:{}'.format(user_id)
+
+
+def bump_user_versions(user_ids):
+    user_ids = set(user_ids)
+    if len(user_ids) == 0:
+        return
+
+    User.objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    for user_id in user_ids:
+        bump_version(get_user_namespace(user_id))
+
+    # Forgotten again once committed, another request reading the version in between mirrors the previous one
+    keys = [get_user_version_key(i) for i in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bump_user_version(user_id):
+    bump_user_versions((user_id,))
+
+
+def mirror_user_version(user_id, version):
+    cache.set(get_user_version_key(user_id), version, timeout=settings.USER_VERSION_CACHE_TIMEOUT)
+
+
+def load_user_version(user_id):
+    # None if the user does not exist anymore, which no token matches
+    version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+    if version is not None:
+        mirror_user_version(user_id, version)
+
+    return version
+
+
+def get_user_version(user_id):
+    version = cache.get(get_user_version_key(user_id))
+    if version is None:
+        version = load_user_version(user_id)
+
+    return version
+
+
+def get_access_claims(request):
+    # Claims of access tokens are checked against the version of the user when authenticating, they are trusted on
+    # read paths only so that writes are always authorized from the database
+    claims = getattr(request, 'auth', None)
+    if isinstance(claims, AccessClaims) and request.method in permissions.SAFE_METHODS:
+        return claims
+    return None
+
+
+def load_group_names(user_id):
+    key = 'user-groups:{}'.format(user_id)
+    version_key = get_version_key(get_user_namespace(user_id))
+
+    values = cache.get_many([key, version_key])
+    version = values.get(version_key, 0)
+    entry = values.get(key)
+    if entry is not None and entry[0] == version:
+        return frozenset(entry[1])
+
+    names = frozenset(Group.objects.filter(user=user_id).values_list('name', flat=True))
+    cache.set(key, (version, sorted(names)), timeout=settings.USER_CLAIMS_TIMEOUT)
+
+    return names
+
+
+def get_group_names(request):
+    claims = get_access_claims(request)
+    if claims is not None:
+        return claims.group_names
+
+    holder = getattr(request, '_request', request)
+
+    try:
+        return holder.group_names
+    except AttributeError:
+        pass
+
+    if request.user.is_authenticated:
+        names = load_group_names(request.user.id)
+    else:
+        names = frozenset()
+
+    holder.group_names = names
+
+    return names
@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from core.benchmark import percentile
+from user.authentication import CachedTokenAuthentication
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost of authenticating a request by session, by token and by cached token as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='Username of the user authenticating.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per authentication method.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError('User {} does not exist.'.format(options['user']))
+
+        factory = RequestFactory()
+        client = Client()
+        client.force_login(user)
+        session_key = client.session.session_key
+        token, _ = Token.objects.get_or_create(user=user)
+
+        def get_session_request():
+            # Sessions are loaded by the middleware, which is part of their cost
+            request = factory.get('/')
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+            SessionMiddleware(lambda request: None).process_request(request)
+            AuthenticationMiddleware(lambda request: None).process_request(request)
+            return Request(request)
+
+        def get_token_request():
+            return Request(factory.get('/', HTTP_AUTHORIZATION='Token {}'.format(token.key)))
+
+        methods = (
+            ('session', SessionAuthentication(), get_session_request),
+            ('token', TokenAuthentication(), get_token_request),
+            ('cached_token', CachedTokenAuthentication(), get_token_request),
+        )
+
+        cache.clear()
+        report = dict()
+        for name, authenticator, get_request in methods:
+            report[name] = self.benchmark(authenticator, get_request, options['requests'])
+
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+
+    def benchmark(self, authenticator, get_request, requests):
+        # The first request warms up the cache of the cached token and is not measured
+        authenticator.authenticate(get_request())
+
+        latencies = list()
+        query_counts = list()
+
+        for _ in range(requests):
+            request = get_request()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                authenticator.authenticate(request)
+                latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+
+        latencies.sort()
+
+        return {
+            'requests': requests,
+            'mean_ms': round(sum(latencies) / len(latencies), 4),
+            'p50_ms': round(percentile(latencies, 50), 4),
+            'p95_ms': round(percentile(latencies, 95), 4),
+            'queries': round(sum(query_counts) / len(query_counts), 2),
+        }
@@ -45,6 +45,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Version of the claims of the user, only changed through user.claims.bump_user_version
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
     USERNAME_FIELD = 'username'
 
     objects = UserManager()
@@ -52,6 +55,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return '{}'.format(self.username)
 
+    def save(self, *args, **kwargs):
+        # Instances loaded before a bump would otherwise write the previous version back
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                i.name for i in self._meta.concrete_fields if not i.primary_key and i.name != 'token_version'
+            ]
+        super().save(*args, **kwargs)
+
 
 class EmailPreference(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -1,14 +1,16 @@
 from rest_framework import permissions
 
+from user.claims import get_group_names
+
 
 class IsStudent(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='student').exists()
+        return 'student' in get_group_names(request)
 
 
 class IsLecturer(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='lecturer').exists()
+        return 'lecturer' in get_group_names(request)
 
 
 class IsProfileOwner(permissions.BasePermission):
@@ -9,7 +9,10 @@ from user.models import User, EmailPreference
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        exclude = ('password', 'is_active', 'is_staff', 'is_superuser', 'last_login', 'groups', 'user_permissions')
+        exclude = (
+            'password', 'is_active', 'is_staff', 'is_superuser', 'last_login', 'groups', 'user_permissions',
+            'token_version',
+        )
         read_only_fields = ('username', 'name')
 
     def validate(self, data):
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import forget_tokens
+from user.claims import bump_user_version, bump_user_versions
+from user.models import User
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def bump_group_member_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add(...), remove(...) and clear()
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_user_version(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear() does not give the users afterwards
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        bump_user_versions(getattr(instance, '_cleared_user_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        bump_user_versions(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_renamed_group_member_versions(sender, instance, created=False, **kwargs):
+    if not created:
+        bump_user_versions(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Other workers see the revocation through the version of the user
+    forget_tokens((instance.key,))
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Cached tokens hold a snapshot of their user and access tokens its flags, deleting a user deletes its tokens.
+    # Logging in only updates last_login.
+    if not created and set(update_fields or ()) != {'last_login'}:
+        forget_tokens(Token.objects.filter(user=instance.pk).values_list('key', flat=True))
+        bump_user_version(instance.pk)
@@ -1,7 +1,28 @@
+import datetime
+import io
+import json
+
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
 from rest_framework.test import APITestCase
 
+from community.models import Club
+from core.roles import get_active_positions
+from membership.models import Membership
+from membership.transitions import apply_transitions
+from user.access_tokens import AccessTokenAuthentication, issue_access_token, read_access_token
+from user.authentication import CachedTokenAuthentication, get_token_cache_key
+from user.claims import get_group_names, get_user_version_key
 from user.models import User
+from user.permissions import IsLecturer, IsStudent
 
 BOB = {'username': 'bob', 'password': 'password303'}
 ALICE = {'username': 'alice', 'password': 'password41153'}
@@ -56,4 +77,308 @@ class UserTest(APITestCase):
         for i in self.parameters:
             self.assertIn(i, response.data)
 
-        self.client.logout()
\ No newline at end of file
+        self.client.logout()
+
+
+class UserClaimsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.student = Group.objects.create(name='student')
+        self.lecturer = Group.objects.create(name='lecturer')
+        self.bob.groups.add(self.student)
+
+        self.factory = RequestFactory()
+
+    def get_group_names(self, user):
+        request = self.factory.get('/')
+        request.user = user
+        return get_group_names(request)
+
+    def test_group_names(self):
+        self.assertEqual(self.get_group_names(self.bob), frozenset({'student'}))
+
+        # Answered from the cache afterwards, and once per request
+        with self.assertNumQueries(0):
+            request = self.factory.get('/')
+            request.user = self.bob
+            self.assertTrue(IsStudent().has_permission(request, None))
+            self.assertFalse(IsLecturer().has_permission(request, None))
+
+    def test_invalidation(self):
+        self.get_group_names(self.bob)
+
+        self.bob.groups.add(self.lecturer)
+        self.assertEqual(self.get_group_names(self.bob), frozenset({'student', 'lecturer'}))
+
+        self.student.user_set.remove(self.bob)
+        self.assertEqual(self.get_group_names(self.bob), frozenset({'lecturer'}))
+
+        self.lecturer.name = 'professor'
+        self.lecturer.save()
+        self.assertEqual(self.get_group_names(self.bob), frozenset({'professor'}))
+
+        self.lecturer.user_set.clear()
+        self.assertEqual(self.get_group_names(self.bob), frozenset())
+
+    def test_group_changes_queries(self):
+        users = [User.objects.create_user(username='user{}'.format(i)) for i in range(5)]
+        self.student.user_set.add(*users)
+
+        # The group update, its members and one update of the versions of every member
+        self.student.name = 'undergraduate'
+        with self.assertNumQueries(3):
+            self.student.save()
+
+    def test_anonymous(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_group_names(AnonymousUser()), frozenset())
+
+
+class TokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+
+    def login(self):
+        response = self.client.post('/api/user/login/', {
+            'username': BOB['username'],
+            'password': BOB['password']
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('expires_at', response.data)
+
+        return response.data['token']
+
+    def get_me(self, token):
+        return self.client.get('/api/user/user/me/', HTTP_AUTHORIZATION='Token {}'.format(token))
+
+    def test_cached_token(self):
+        token = self.login()
+
+        response = self.get_me(token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], BOB['username'])
+
+        # Later requests resolve the token from the cache
+        with self.assertNumQueries(0):
+            user, key = CachedTokenAuthentication().authenticate_credentials(token)
+        self.assertEqual(user.id, self.bob.id)
+
+    def test_revocation(self):
+        token = self.login()
+        self.get_me(token)
+
+        response = self.client.post('/api/user/logout/', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.get_me(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Token.objects.filter(key=token).exists())
+
+    def test_revocation_through_another_worker(self):
+        token = self.login()
+        self.get_me(token)
+
+        # The worker deleting the token forgets it, the cache of another one still holds it
+        entry = cache.get(get_token_cache_key(token))
+        Token.objects.filter(key=token).delete()
+        cache.set(get_token_cache_key(token), entry)
+        cache.delete(get_user_version_key(self.bob.id))
+
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(token)
+
+    def test_user_changed(self):
+        token = self.login()
+        self.get_me(token)
+
+        self.bob.is_active = False
+        self.bob.save()
+
+        response = self.get_me(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expiry(self):
+        token = self.login()
+        Token.objects.filter(key=token).update(created=timezone.now() - datetime.timedelta(days=8))
+
+        response = self.get_me(token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Logging in again replaces the expired token
+        new_token = self.login()
+        self.assertNotEqual(token, new_token)
+        self.assertEqual(self.get_me(new_token).status_code, status.HTTP_200_OK)
+
+    def test_benchmark(self):
+        output = io.StringIO()
+        call_command('benchmark_authentication', BOB['username'], requests=5, stdout=output)
+        report = json.loads(output.getvalue())
+
+        self.assertEqual(set(report), {'session', 'token', 'cached_token'})
+        self.assertGreater(report['token']['queries'], 0)
+        self.assertEqual(report['cached_token']['queries'], 0)
+
+
+class AccessTokenTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.bob = User.objects.create_user(username=BOB['username'], password=BOB['password'])
+        self.alice = User.objects.create_user(username=ALICE['username'], password=ALICE['password'])
+        self.bob.groups.add(Group.objects.create(name='student'))
+
+        self.chess = Club.objects.create(name_th='ชมรมหมากรุก', name_en='Chess Club')
+        self.music = Club.objects.create(name_th='ชมรมดนตรี', name_en='Music Club')
+        self.leader = Membership.objects.create(user=self.bob, community=self.chess, position=3)
+        Membership.objects.create(user=self.bob, community=self.music, position=0)
+        self.member = Membership.objects.create(user=self.alice, community=self.chess, position=0)
+
+        self.factory = RequestFactory()
+
+    def get_request(self, access_token, method='get'):
+        request = getattr(self.factory, method)('/', HTTP_AUTHORIZATION='Bearer {}'.format(access_token))
+        return Request(request, authenticators=(AccessTokenAuthentication(),))
+
+    def test_login(self):
+        response = self.client.post('/api/user/login/', {
+            'username': BOB['username'],
+            'password': BOB['password']
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(
+            '/api/user/user/me/', HTTP_AUTHORIZATION='Bearer {}'.format(response.data['access_token'])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], BOB['username'])
+
+    def test_claims(self):
+        access_token, _ = issue_access_token(self.bob)
+        request = self.get_request(access_token)
+
+        # Authentication and authorization of reads do not query the database
+        with self.assertNumQueries(0):
+            self.assertEqual(request.user.id, self.bob.id)
+            self.assertEqual(get_active_positions(request), {self.chess.id: 3, self.music.id: 0})
+            self.assertEqual(get_group_names(request), frozenset({'student'}))
+
+        # Writes are authenticated and authorized from the database
+        request = self.get_request(access_token, method='post')
+        with self.assertNumQueries(2):
+            self.assertEqual(get_active_positions(request), {self.chess.id: 3, self.music.id: 0})
+
+    def test_writes(self):
+        User.objects.filter(pk=self.bob.id).update(name='Bob', email='bob@example.com')
+        access_token, _ = issue_access_token(self.bob)
+
+        response = self.client.patch(
+            '/api/user/user/{}/'.format(self.bob.id), {'bio': 'Chess player', 'birthdate': None},
+            HTTP_AUTHORIZATION='Bearer {}'.format(access_token), format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], 'bob@example.com')
+
+        # The user rebuilt from the claims for reads is never saved
+        access_token, _ = issue_access_token(self.bob)
+        with self.assertRaises(TypeError):
+            self.get_request(access_token).user.save()
+
+        # The user of writes is loaded, saving it does not blank its profile
+        request = self.get_request(access_token, method='patch')
+        request.user.nickname = 'B'
+        request.user.save()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.bob.name, self.bob.email, self.bob.nickname), ('Bob', 'bob@example.com', 'B'))
+        self.assertTrue(self.bob.check_password(BOB['password']))
+
+        access_token, _ = issue_access_token(self.bob)
+
+        User.objects.filter(pk=self.bob.id).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.get_request(access_token, method='patch').user
+
+    def test_invalid(self):
+        access_token, _ = issue_access_token(self.bob)
+        payload, signature = access_token.split('.')
+
+        for token in (payload, '{}.{}'.format(payload, signature[::-1]), '{}x.{}'.format(payload, signature)):
+            with self.assertRaises(AuthenticationFailed):
+                read_access_token(token)
+
+        with override_settings(ACCESS_TOKEN_LIFETIME=0):
+            access_token, _ = issue_access_token(self.bob)
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+    def test_membership_changed(self):
+        bob_token, _ = issue_access_token(self.bob)
+        alice_token, _ = issue_access_token(self.alice)
+
+        # Promoting Alice demotes Bob through a bulk update
+        memberships, errors = apply_transitions({self.member.id: (3, None)}, self.bob)
+        self.assertEqual(errors, dict())
+
+        for access_token in (bob_token, alice_token):
+            with self.assertRaises(AuthenticationFailed):
+                read_access_token(access_token)
+
+        access_token, _ = issue_access_token(self.bob)
+        self.assertEqual(get_active_positions(self.get_request(access_token))[self.chess.id], 2)
+
+        self.leader.delete()
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+    def test_groups_changed(self):
+        access_token, _ = issue_access_token(self.bob)
+        self.bob.groups.clear()
+
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+    def test_renewal(self):
+        token = Token.objects.create(user=self.bob)
+        access_token, _ = issue_access_token(self.bob)
+
+        response = self.client.post('/api/user/access-token/', HTTP_AUTHORIZATION='Bearer {}'.format(access_token))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post('/api/user/access-token/', HTTP_AUTHORIZATION='Token {}'.format(token.key))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(read_access_token(response.data['access_token'])['sub'], self.bob.id)
+
+        # Logging out revokes the access tokens too
+        response = self.client.post('/api/user/logout/', HTTP_AUTHORIZATION='Token {}'.format(token.key))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+    def test_version_is_durable(self):
+        self.bob.refresh_from_db()
+        access_token, _ = issue_access_token(self.bob)
+        self.bob.groups.clear()
+
+        # Neither an evicted version nor a worker with its own cache takes an outdated token for a valid one
+        cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+        # Saving an instance loaded before a bump does not write the previous version back
+        access_token, _ = issue_access_token(self.bob)
+        self.bob.name = 'Bob'
+        self.bob.save()
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
+
+    def test_version_mirror_timeout(self):
+        access_token, _ = issue_access_token(self.bob)
+        # A bump made through another worker, whose cache is not shared
+        User.objects.filter(pk=self.bob.id).update(token_version=F('token_version') + 1)
+
+        # Accepted until the mirror of the version in this worker expires
+        read_access_token(access_token)
+        cache.delete(get_user_version_key(self.bob.id))
+        with self.assertRaises(AuthenticationFailed):
+            read_access_token(access_token)
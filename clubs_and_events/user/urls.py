@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from user.views import UserViewSet, LoginAPIView, EmailPreferenceViewSet, MyUserViewSet
+from user.views import UserViewSet, LoginAPIView, LogoutAPIView, AccessTokenAPIView, EmailPreferenceViewSet
+from user.views import MyUserViewSet
 
 router = DefaultRouter()
 router.register('user/email-preference', EmailPreferenceViewSet)
@@ -10,5 +11,7 @@ router.register('user', UserViewSet)
 urlpatterns = [
     path('user/me/', MyUserViewSet.as_view()),
     path('login/', LoginAPIView.as_view()),
+    path('logout/', LogoutAPIView.as_view()),
+    path('access-token/', AccessTokenAPIView.as_view()),
     path('', include(router.urls))
 ]
\ No newline at end of file
@@ -1,20 +1,32 @@
 from rest_framework import viewsets, filters, status, generics
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework import permissions
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from core.utils import filter_queryset
+from core.conditional import ConditionalGetMixin
+from core.filters import FilterSpec, QueryFilter, boolean
+from user.access_tokens import issue_access_token
+from user.authentication import CachedTokenAuthentication, get_token_expiry, is_token_expired
+from user.claims import bump_user_version
 from user.models import User, EmailPreference
 from user.permissions import IsProfileOwner
 from user.serializers import UserSerializer, LimitedUserSerializer, EmailPreferenceSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     http_method_names = ('get', 'put', 'patch', 'head', 'options')
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username', 'name', 'nickname')
+    filter_spec = FilterSpec(
+        is_active=QueryFilter(boolean, lookups=('exact',)),
+        is_staff=QueryFilter(boolean, lookups=('exact',)),
+        is_superuser=QueryFilter(boolean, lookups=('exact',)),
+    )
 
     def get_permissions(self):
         if self.request.method in ('PUT', 'PATCH'):
@@ -30,13 +42,12 @@ class UserViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset()
 
         if self.request.user.is_authenticated:
-            queryset = filter_queryset(queryset, request, target_param='is_active', is_foreign_key=False)
-            queryset = filter_queryset(queryset, request, target_param='is_staff', is_foreign_key=False)
-            queryset = filter_queryset(queryset, request, target_param='is_superuser', is_foreign_key=False)
+            queryset = self.filter_spec.filter_queryset(queryset, request)
 
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
 
 class MyUserViewSet(generics.ListAPIView):
@@ -52,7 +63,51 @@ class MyUserViewSet(generics.ListAPIView):
 
 
 class LoginAPIView(ObtainAuthToken):
-   renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        token, created = Token.objects.get_or_create(user=user)
+
+        # Expired tokens are replaced by a new one on the next login
+        if not created and is_token_expired(token.created):
+            token.delete()
+            token = Token.objects.create(user=user)
+
+        access_token, access_expires_at = issue_access_token(user)
+
+        return Response({
+            'token': token.key,
+            'expires_at': get_token_expiry(token.created),
+            'access_token': access_token,
+            'access_expires_at': access_expires_at,
+        })
+
+
+class AccessTokenAPIView(APIView):
+    # Issues a new access token, access tokens themselves are not accepted so that they are not renewed indefinitely
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        access_token, access_expires_at = issue_access_token(request.user)
+
+        return Response({'access_token': access_token, 'access_expires_at': access_expires_at})
+
+
+class LogoutAPIView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        # Revokes the token of the user and its access tokens, deleting the token also removes it from the cache
+        if request.auth is not None:
+            Token.objects.filter(user_id=request.user.id).delete()
+            bump_user_version(request.user.id)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class EmailPreferenceViewSet(viewsets.ModelViewSet):